@@ -0,0 +1,465 @@
+import hashlib
+import json
+import os
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.path.join(BASE_DIR, "fixtures")   # recordings made with --record
+LATENCY_MS = 50        # injected per response, before the first byte
+BANDWIDTH_KBPS = 2000  # injected per response; 0 for unlimited
+CHUNK_SIZE = 16 * 1024
+PAGE_TRAILER = "<script>var w = 0;</script>" * 4000  # scripts and footer after the content on real pages
+
+# (name, module, entry point, snapshot used to build fixtures and check output)
+SOURCES = [
+    ("stockwatch", "stockwatch_rss", "fetch_stockwatch_news", "stockwatch-feed.xml"),
+    ("capitalmarket", "capitalmarket_rss", "fetch_cm_news", "capital-market-news.xml"),
+    ("skicapital", "skicapital_scraper", "main", "skicapital_news.xml"),
+    ("whalesbook", "whalesbook_rss", "main", "whalesbook-news.xml"),
+    ("trendlyne", "trendlyne_to_rss", "fetch_and_build_rss", "trendlyne-news.xml"),
+    ("marketsmojo", "marketsmojo_rss", "main", "marketsmojo_news.xml"),
+    ("buzzing_stocks", "buzzing_stocks_rss", "main", "buzzing_stocks.xml"),
+    ("bulk_deals", "mc_bulk_deals", "main", "bulk-deals.xml"),
+    ("dhan", "dhan_scanx_rss", "main", "dhan-scanx-news.xml"),
+]
+
+
+# ================= FIXTURES ==================
+class Fixtures:
+    """Canned responses keyed by method and URL, optionally by request body."""
+
+    def __init__(self):
+        self.responses = {}
+
+    def add(self, method, url, body, content_type="application/json", status=200, request_body=None):
+        if not isinstance(body, bytes):
+            body = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+        key = (method, url, _sha1(request_body) if request_body is not None else None)
+        self.responses[key] = (status, content_type, body)
+
+    def lookup(self, method, url, request_body=b""):
+        return (self.responses.get((method, url, _sha1(request_body)))
+                or self.responses.get((method, url, None)))
+
+    def load_recorded(self, directory=FIXTURE_DIR):
+        """Add the responses recorded with --record; they win over snapshot fixtures."""
+        try:
+            with open(os.path.join(directory, "index.json"), encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        for entry in index:
+            with open(os.path.join(directory, entry["file"]), "rb") as f:
+                body = f.read()
+            key = (entry["method"], entry["url"], entry.get("body_sha1"))
+            self.responses[key] = (entry["status"], entry["content_type"], body)
+            self.responses.setdefault((entry["method"], entry["url"], None), self.responses[key])
+        return len(index)
+
+
+def _sha1(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha1(data or b"").hexdigest()
+
+
+def snapshot_items(path):
+    """Items of a committed feed; tolerant of the odd malformed snapshot."""
+    import lxml.etree
+    import feed_merge
+    if not os.path.exists(path):
+        return []
+    tree = lxml.etree.parse(path, lxml.etree.XMLParser(recover=True))
+    return [feed_merge.element_to_item(el) for el in tree.iter("item")]
+
+
+def _page(body):
+    return f"<html><head><title>page</title></head><body>{body}{PAGE_TRAILER}</body></html>"
+
+
+def _plain(html):
+    return re.sub(r"\s+", " ", re.sub(r"<[^>]+>", " ", html or "")).strip()
+
+
+def _date(item):
+    try:
+        return parsedate_to_datetime(item["pubDate"])
+    except (KeyError, TypeError, ValueError):
+        return datetime(2026, 1, 1)
+
+
+def build_stockwatch(fx, items):
+    import stockwatch_rss as m
+    events = []
+    for it in items:
+        match = re.match(r"\[([^\]]+)\] (.*)", it.get("title") or "")
+        code, title = match.groups() if match else (None, it.get("title"))
+        events.append({
+            "uuid": it.get("guid"), "title": title, "category": it.get("category"),
+            "summary": _plain(it.get("description", "")).split(" Company:")[0],
+            "createdAt": _date(it).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+            "stock": {"code": code, "name": code},
+        })
+    fx.add("GET", m.API_URL, {"success": True, "data": events})
+
+
+def build_capitalmarket(fx, items):
+    import capitalmarket_rss as m
+    articles = []
+    for it in items:
+        sno = (it.get("guid") or "cm-0")[3:]
+        body = (it.get("description") or "").split("\n\n<strong>Category:")[0].split("\n\n", 1)[-1]
+        dt = _date(it)
+        articles.append({"SNO": sno, "Heading": it.get("title"), "sectionname": it.get("category"),
+                         "Date": dt.strftime("%d %b %Y"), "Time": dt.strftime("%H:%M")})
+        link = f"{m.BASE_ITEM_URL}/{m.create_slug(it.get('title'))}/{sno}"
+        fx.add("GET", link, _page(f'<div id="divtxt" class="memo-content">{body}</div>'), "text/html; charset=utf-8")
+    fx.add("GET", m.API_URL, {"success": True, "data": articles})
+
+
+def build_skicapital(fx, items):
+    import skicapital_scraper as m
+    rows = []
+    for it in items:
+        dt = _date(it)
+        rows.append(f'<tr><td>{dt.strftime("%d-%b-%y")}</td><td>{dt.strftime("%H:%M")}</td>'
+                    f'<td><a href="{it.get("link")}">{it.get("title")}</a></td></tr>')
+        fx.add("GET", it.get("link"), _page(
+            f'<table><tr><td style="text-align: justify">{it.get("description", "")}</td></tr></table>'
+        ), "text/html; charset=utf-8")
+    fx.add("GET", m.NEWS_URL, _page(f"<form><table>{''.join(rows)}</table></form>"), "text/html; charset=utf-8")
+
+
+def build_whalesbook(fx, items):
+    import whalesbook_rss as m
+    data = []
+    for it in items:
+        parts = (it.get("link") or "").rstrip("/").split("/")
+        data.append({"_id": parts[-1], "headline": it.get("title"), "newsType": parts[-3] if len(parts) > 3 else "",
+                     "shortDescription": it.get("description", ""),
+                     "scrappedAt": _date(it).strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+                     "imageUrl": (it.get("enclosure") or {}).get("url")})
+    fx.add("POST", m.API_URL, {"data": data})
+
+
+def build_trendlyne(fx, items):
+    import trendlyne_to_rss as m
+    posts = []
+    for it in items:
+        m_id = re.search(r"/posts/(\d+)/", it.get("link") or "")
+        img = re.search(r'<img src="([^"]*)"', it.get("description") or "")
+        posts.append({"title": it.get("title"), "postId": int(m_id.group(1)) if m_id else 0,
+                      "shortText": _plain(it.get("description", "")).split(" Premium:")[0],
+                      "imageUrl": img.group(1) if img else "", "pubDate": _date(it).isoformat()})
+    fx.add("GET", m.API_URL, {"body": {"main": posts}})
+
+
+def build_marketsmojo(fx, items):
+    import marketsmojo_rss as m
+    cards = []
+    for it in items:
+        desc, _, when = (it.get("description") or "").partition("\nTime: ")
+        cards.append(f'<div class="news-article-card"><a href="{it.get("link")}"><img/></a>'
+                     f'<h3 class="card-title">{it.get("title")}</h3><div class="card-body"><p>{desc}</p></div>'
+                     f'<div class="article-card-footer"><div>{when}</div></div></div>')
+    fx.add("GET", m.NEWS_URL, _page(f'<div id="{m.CONTAINER_ID}">{"".join(cards)}</div>'), "text/html; charset=utf-8")
+
+
+def build_buzzing_stocks(fx, items):
+    import buzzing_stocks_rss as m
+    anchors = "".join(f'<li><a href="{it.get("link")}">{it.get("title")}</a></li>' for it in items)
+    fx.add("GET", m.URL, _page(f"<ul>{anchors}</ul>"), "text/html; charset=utf-8")
+
+
+def build_bulk_deals(fx, items):
+    import mc_bulk_deals as m
+    deals = []
+    for it in items:
+        match = re.match(r"(\w+): (.+?) \((\d+) qty\) by (.+)", it.get("title") or "")
+        if match:
+            action, symbol, qty, client = match.groups()
+            deals.append({"symbol": symbol, "clientName": client, "buySell": action, "quantity": int(qty),
+                          "tradePrice": 0, "dealDate": _date(it).strftime("%d-%b-%Y")})
+    fx.add("GET", m.BASE_URL, "<html></html>", "text/html")
+    fx.add("GET", m.API_URL, {"bulkDeals": deals, "blockDeals": []})
+
+
+def build_dhan(fx, items):
+    import dhan_scanx_rss as m
+    articles = []
+    for it in items:
+        img = re.search(r'<img src="' + re.escape(m.IMG_BASE) + r'([^"]*)"', it.get("description") or "")
+        articles.append({"articletitle": it.get("title"), "id": (it.get("link") or "").rstrip("/").split("/")[-1],
+                         "imageurl": img.group(1) if img else ""})
+    body = {"category": m.COMBINED_FEED[2], "subcategory": "all"}
+    fx.add("POST", m.API_URL, {"data": {"Articlelist": {"Articles": articles}}}, request_body=json.dumps(body))
+
+
+BUILDERS = {name: globals()[f"build_{name}"] for name, *_ in SOURCES}
+
+
+def build_fixtures(names):
+    """Fixtures rebuilt from the committed snapshots, then any recordings on top."""
+    fx = Fixtures()
+    for name, _, _, snapshot in SOURCES:
+        if name in names:
+            BUILDERS[name](fx, snapshot_items(os.path.join(BASE_DIR, snapshot)))
+    fx.load_recorded()
+    return fx
+
+
+# ================= STAND-IN SERVER ==================
+class StandInServer(ThreadingHTTPServer):
+    """Serves fixtures for URLs rewritten to http://host:port/<scheme>/<host>/<path>."""
+
+    daemon_threads = True
+
+    def __init__(self, fixtures, latency_ms=LATENCY_MS, bandwidth_kbps=BANDWIDTH_KBPS):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.fixtures = fixtures
+        self.latency = latency_ms / 1000
+        self.bandwidth = bandwidth_kbps * 1024
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.misses = []
+
+    def count(self, sent):
+        with self.lock:
+            self.bytes_sent += sent
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _serve(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        request_body = self.rfile.read(length) if length else b""
+        scheme, _, rest = self.path.lstrip("/").partition("/")
+        url = f"{scheme}://{rest}"
+        with server.lock:
+            server.requests += 1
+        found = server.fixtures.lookup(self.command, url, request_body)
+        if found is None:
+            with server.lock:
+                server.misses.append(f"{self.command} {url}")
+            found = (404, "text/plain", b"no fixture")
+        status, content_type, body = found
+
+        time.sleep(server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        sent = 0
+        try:
+            for i in range(0, len(body), CHUNK_SIZE):
+                chunk = body[i:i + CHUNK_SIZE]
+                self.wfile.write(chunk)
+                sent += len(chunk)
+                if server.bandwidth:
+                    time.sleep(len(chunk) / server.bandwidth)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # client stopped reading early
+        server.count(sent)
+
+    do_GET = do_POST = _serve
+
+    def log_message(self, *args):
+        pass
+
+
+# ================= CHILD: ONE SOURCE ==================
+def _patch_transport(make_adapter):
+    """Make every pooled session send its requests through `make_adapter()`."""
+    import http_pool
+    base = http_pool.PooledSession
+
+    class BenchSession(base):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            adapter = make_adapter()
+            self.mount("https://", adapter)
+            self.mount("http://", adapter)
+
+    http_pool.PooledSession = BenchSession
+
+
+def _stand_in_adapter(port):
+    from http_pool import TimedAdapter
+
+    class StandInAdapter(TimedAdapter):
+        def send(self, request, **kwargs):
+            parts = urlsplit(request.url)
+            request.url = f"http://127.0.0.1:{port}/{parts.scheme}/{parts.netloc}{parts.path}" + (
+                f"?{parts.query}" if parts.query else "")
+            return super().send(request, **kwargs)
+
+    return StandInAdapter(pool_maxsize=16)
+
+
+def _recording_adapter(directory):
+    from http_pool import TimedAdapter
+    lock = threading.Lock()
+    index_path = os.path.join(directory, "index.json")
+
+    class RecordingAdapter(TimedAdapter):
+        def send(self, request, **kwargs):
+            resp = super().send(request, **kwargs)
+            body = resp.content
+            entry = {"method": request.method, "url": request.url, "status": resp.status_code,
+                     "content_type": resp.headers.get("Content-Type", ""),
+                     "body_sha1": _sha1(request.body) if request.method == "POST" else None,
+                     "file": _sha1(f"{request.method} {request.url} {request.body!r}") + ".bin"}
+            with lock:
+                os.makedirs(directory, exist_ok=True)
+                with open(os.path.join(directory, entry["file"]), "wb") as f:
+                    f.write(body)
+                try:
+                    with open(index_path, encoding="utf-8") as f:
+                        index = json.load(f)
+                except (OSError, ValueError):
+                    index = []
+                index = [e for e in index if e["file"] != entry["file"]] + [entry]
+                with open(index_path, "w", encoding="utf-8") as f:
+                    json.dump(index, f, indent=1)
+            return resp
+
+    return RecordingAdapter(pool_maxsize=16)
+
+
+def run_child(name, port, workdir, record=False):
+    """Run one source in this process and print its measurements as JSON."""
+    sys.path.insert(0, BASE_DIR)
+    os.chdir(workdir)
+    import body_cache
+    import http_cache
+    import item_store
+    import run_metrics
+    http_cache.CACHE_DIR = os.path.join(workdir, ".cache", "http")
+    body_cache.CACHE_DIR = os.path.join(workdir, ".cache")
+    item_store.DB_FILE = os.path.join(workdir, ".cache", "items.db")
+    run_metrics.METRICS_DIR = os.path.join(workdir, "metrics")
+    run_metrics.RUNS_FILE = os.path.join(run_metrics.METRICS_DIR, "runs.jsonl")
+    if record:
+        _patch_transport(lambda: _recording_adapter(FIXTURE_DIR))
+    else:
+        _patch_transport(lambda: _stand_in_adapter(port))
+
+    import importlib
+    _, module_name, func_name, _ = next(s for s in SOURCES if s[0] == name)
+    module = importlib.import_module(module_name)
+    if isinstance(getattr(module, "body_cache", None), body_cache.BodyCache):
+        # Built at import against the repo's cache; start every run cold instead
+        name = os.path.basename(module.body_cache.path)[len("bodies-"):-len(".json")]
+        module.body_cache = body_cache.BodyCache(name, cache_dir=body_cache.CACHE_DIR)
+    if hasattr(module, "rate_limiter"):
+        module.rate_limiter = module.TokenBucket(1000, 1000)  # politeness is for the real site
+    if module_name == "mc_bulk_deals" and not record:
+        module.time.sleep = lambda s: None  # handshake pause; the stand-in needs no cookies
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    error = None
+    try:
+        getattr(module, func_name)()
+    except (Exception, SystemExit) as e:
+        error = f"{type(e).__name__}: {e}"
+    result = {
+        "wall_s": round(time.perf_counter() - wall, 3),
+        "cpu_s": round(time.process_time() - cpu, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "error": error,
+    }
+    runs = run_metrics.read_runs()
+    if runs:
+        result["stages"] = runs[-1]["stages"]
+    print("BENCH_RESULT " + json.dumps(result))
+
+
+# ================= PARENT: ALL SOURCES ==================
+def bench_source(server, name, snapshot, workdir):
+    server.reset()
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", name, str(server.server_port), workdir],
+        capture_output=True, text=True,
+    )
+    line = next((l for l in proc.stdout.splitlines() if l.startswith("BENCH_RESULT ")), None)
+    result = json.loads(line[len("BENCH_RESULT "):]) if line else {"error": proc.stderr[-300:] or "no result"}
+    result.update({"source": name, "requests": server.requests,
+                   "kb": round(server.bytes_sent / 1024, 1), "misses": server.misses})
+
+    expected = {it.get("title") for it in snapshot_items(os.path.join(BASE_DIR, snapshot))}
+    produced = {it.get("title") for it in snapshot_items(os.path.join(workdir, snapshot))}
+    result["expected"] = len(expected)
+    result["matched"] = len(expected & produced)
+    return result
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--child"]:
+        return run_child(args[1], int(args[2]), args[3])
+    if args[:1] == ["--record"]:
+        names = args[1:] or [s[0] for s in SOURCES]
+        for name in names:
+            workdir = tempfile.mkdtemp(prefix=f"record-{name}-")
+            run_child(name, 0, workdir, record=True)
+            shutil.rmtree(workdir, ignore_errors=True)
+        return
+
+    def option(flag, default):
+        return float(args[args.index(flag) + 1]) if flag in args else default
+
+    as_json = "--json" in args
+    latency = option("--latency", LATENCY_MS)
+    bandwidth = option("--bandwidth", BANDWIDTH_KBPS)
+    flag_values = {args[i + 1] for i, a in enumerate(args) if a in ("--latency", "--bandwidth")}
+    names = [a for a in args if not a.startswith("--") and a not in flag_values] or [s[0] for s in SOURCES]
+
+    server = StandInServer(build_fixtures(names), latency, bandwidth)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    results = []
+    try:
+        for name, _, _, snapshot in SOURCES:
+            if name in names:
+                workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+                results.append(bench_source(server, name, snapshot, workdir))
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        server.shutdown()
+
+    if as_json:
+        print(json.dumps({"latency_ms": latency, "bandwidth_kbps": bandwidth, "sources": results}, indent=2))
+        return
+
+    print(f"Stand-in server: {latency:.0f} ms latency, "
+          f"{'unlimited' if not bandwidth else f'{bandwidth:.0f} KB/s'} bandwidth")
+    print(f"{'source':<16}{'wall s':>8}{'cpu s':>8}{'rss MB':>8}{'reqs':>6}{'KB':>9}  output vs snapshot")
+    for r in results:
+        check = f"{r['matched']}/{r['expected']} titles" if r["expected"] else "no snapshot"
+        if r.get("error"):
+            check += f"  ERROR {r['error']}"
+        print(f"{r['source']:<16}{r.get('wall_s', 0):>8.2f}{r.get('cpu_s', 0):>8.2f}"
+              f"{r.get('peak_rss_mb', 0):>8.1f}{r['requests']:>6}{r['kb']:>9.1f}  {check}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import json
+import sys
+import time
+
+import buzzing_stocks_rss
+import capitalmarket_rss
+import html_extract
+import marketsmojo_rss
+import skicapital_scraper
+
+# ================== CONFIG ==================
+RUNS = 20        # best of N parses per page
+ROWS = 200       # listing rows / cards / links per synthetic page
+PARAGRAPHS = 60  # paragraphs per synthetic article page
+
+PADDING = "<script>var x = 1;</script>" * 200   # head scripts and navigation
+TRAILER = "<script>var y = 2;</script>" * 4000  # comments, widgets and footer after the content
+
+
+def _page(body):
+    return f"<html><head><title>t</title>{PADDING}</head><body>{PADDING}{body}{TRAILER}</body></html>"
+
+
+def skicapital_listing(rows=ROWS):
+    trs = "".join(
+        f'<tr><td>2{i % 9}-Dec-25</td><td>08:{i % 60:02d}</td>'
+        f'<td><a href="/news/stock-alert/{i}">Stock alert headline number {i}</a></td></tr>'
+        for i in range(rows)
+    )
+    pager = "".join(
+        f"<a href=\"javascript:__doPostBack('ctl00$grdNews','Page${p}')\">{p}</a>" for p in range(2, 11)
+    )
+    return _page(f"<table><tr><td>DATE</td><td>TIME</td><td>HEADING</td></tr>{trs}</table>{pager}")
+
+
+def skicapital_article(paragraphs=PARAGRAPHS):
+    ps = "".join(
+        f"<P><b>Section {i}</b> Body text of paragraph {i}, with figures {i * 7} and more words.</P>"
+        for i in range(paragraphs)
+    )
+    return _page(f'<table><tr><td style="text-align: justify">{ps}Powered by Capital Market</td></tr></table>')
+
+
+def capitalmarket_article(paragraphs=PARAGRAPHS):
+    ps = "<br/>".join(f"Sentence {i} of the report &amp; its numbers." for i in range(paragraphs))
+    return _page(f'<div id="divtxt" class="memo-content">{ps}</div>')
+
+
+def marketsmojo_cards(cards=ROWS):
+    divs = "".join(
+        f'<div class="news-article-card"><a href="https://www.marketsmojo.com/news/{i}">'
+        f'<h3 class="card-title">Card title {i}</h3></a>'
+        f'<div class="card-body"><p>Snippet {i} for the card.</p></div>'
+        f'<div class="article-card-footer"><div>{i} hours ago</div></div></div>'
+        for i in range(cards)
+    )
+    return _page(f'<div id="news-results-container">{divs}</div>')
+
+
+def buzzing_links(links=ROWS):
+    anchors = "".join(
+        f'<a href="/news/business/stocks/story-{i}.html">Buzzing stock headline long enough number {i}</a>'
+        for i in range(links)
+    )
+    return _page(anchors)
+
+
+class StreamedPage:
+    """Stand-in for a stream=True response serving `html` in socket-sized chunks."""
+
+    headers = {"Content-Type": "text/html; charset=utf-8"}
+
+    def __init__(self, html):
+        self.body = html.encode("utf-8")
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+def streamed(element_id, max_bytes):
+    """Parse function reading a page the way the streamed fetchers do."""
+    def parse(html):
+        element, _ = html_extract.stream_element(StreamedPage(html), element_id, max_bytes=max_bytes)
+        return html_extract.text(element)
+    return parse
+
+
+def bytes_read(build, element_id, max_bytes):
+    return html_extract.stream_element(StreamedPage(build()), element_id, max_bytes=max_bytes)[1]
+
+
+# Streamed fetches: (name, page builder, element id, byte cap)
+STREAMED = [
+    ("capitalmarket article", capitalmarket_article, "divtxt", capitalmarket_rss.MAX_BODY_BYTES),
+    ("marketsmojo container", marketsmojo_cards, marketsmojo_rss.CONTAINER_ID, marketsmojo_rss.MAX_PAGE_BYTES),
+]
+
+# (name, page builder, parse function) per source
+CASES = [
+    ("skicapital listing", skicapital_listing, skicapital_scraper.parse_listing),
+    ("skicapital pagination", skicapital_listing, skicapital_scraper.pager_postbacks),
+    ("skicapital article", skicapital_article, skicapital_scraper.article_text),
+    ("capitalmarket article", capitalmarket_article,
+     streamed("divtxt", capitalmarket_rss.MAX_BODY_BYTES)),
+    ("marketsmojo container", marketsmojo_cards,
+     streamed(marketsmojo_rss.CONTAINER_ID, marketsmojo_rss.MAX_PAGE_BYTES)),
+    ("marketsmojo cards", marketsmojo_cards, marketsmojo_rss.parse_cards),
+    ("buzzing links", buzzing_links, lambda html: buzzing_stocks_rss.NEWS_LINKS(buzzing_stocks_rss.html_extract.parse(html))),
+]
+
+
+def bench(build, parse, runs=RUNS):
+    """Best-of-`runs` seconds to parse one page, the page size and the result size."""
+    html = build()
+    result = parse(html)  # warm-up; also compiles the selectors
+    best = min(_timed(parse, html) for _ in range(runs))
+    return best, len(html), len(result)
+
+
+def _timed(parse, html):
+    start = time.perf_counter()
+    parse(html)
+    return time.perf_counter() - start
+
+
+def main():
+    as_json = "--json" in sys.argv[1:]
+    results = []
+    for name, build, parse in CASES:
+        seconds, size, found = bench(build, parse)
+        results.append({
+            "source": name,
+            "page_kb": round(size / 1024, 1),
+            "parse_ms": round(seconds * 1000, 3),
+            "mb_per_s": round(size / seconds / 1e6, 1),
+            "extracted": found,
+        })
+
+    streams = []
+    for name, build, element_id, max_bytes in STREAMED:
+        size = len(build().encode("utf-8"))
+        read = bytes_read(build, element_id, max_bytes)
+        streams.append({"source": name, "page_kb": round(size / 1024, 1), "read_kb": round(read / 1024, 1)})
+
+    if as_json:
+        print(json.dumps({"parse": results, "streamed": streams}, indent=2))
+        return
+
+    print(f"{'source':<24}{'page KB':>9}{'parse ms':>10}{'MB/s':>8}{'extracted':>11}")
+    for r in results:
+        print(f"{r['source']:<24}{r['page_kb']:>9.1f}{r['parse_ms']:>10.3f}{r['mb_per_s']:>8.1f}{r['extracted']:>11}")
+    print(f"\n{'streamed fetch':<24}{'page KB':>9}{'read KB':>10}")
+    for r in streams:
+        print(f"{r['source']:<24}{r['page_kb']:>9.1f}{r['read_kb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
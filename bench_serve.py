@@ -0,0 +1,141 @@
+import http.client
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+READERS = 32        # concurrent clients, each on its own keep-alive connection
+DURATION = 3.0      # seconds per scenario
+
+# (scenario, server, request headers); "etag" is filled in per feed
+SCENARIOS = [
+    ("static file server, full", "static", {}),
+    ("feed_server, identity", "feed", {}),
+    ("feed_server, gzip", "feed", {"Accept-Encoding": "gzip"}),
+    ("feed_server, br", "feed", {"Accept-Encoding": "br, gzip"}),
+    ("feed_server, 304", "feed", {"Accept-Encoding": "gzip", "If-None-Match": "etag"}),
+]
+
+SERVING = re.compile(r"http://[\d.]+:(\d+)/")
+
+
+def start_server(kind):
+    """Start a server process on a free port: (process, port)."""
+    if kind == "feed":
+        cmd = [sys.executable, "-u", os.path.join(BASE_DIR, "feed_server.py"), "--port", "0"]
+    else:
+        # What readers get today: plain files, no compression, no ETags
+        cmd = [sys.executable, "-u", "-m", "http.server", "0", "--bind", "127.0.0.1"]
+    # stderr is dropped: http.server logs every request there and would block on a full pipe
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    line = proc.stdout.readline()
+    match = SERVING.search(line) or re.search(r"port (\d+)", line)
+    if not match:
+        proc.kill()
+        raise RuntimeError(f"server did not start: {line}")
+    return proc, int(match.group(1))
+
+
+def feed_paths():
+    return sorted("/" + n for n in os.listdir(BASE_DIR) if n.endswith(".xml"))
+
+
+def reader(port, paths, headers, etags, deadline, stats, lock):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    latencies, nbytes, errors, i = [], 0, 0, 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        sent = {k: (etags[path] if v == "etag" else v) for k, v in headers.items()}
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=sent)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+        nbytes += len(body) + sum(len(k) + len(v) + 4 for k, v in resp.getheaders())
+        if resp.getheader("Connection", "").lower() == "close" or resp.version == 10:
+            conn.close()
+    conn.close()
+    with lock:
+        stats["latencies"] += latencies
+        stats["bytes"] += nbytes
+        stats["errors"] += errors
+
+
+def run_scenario(port, paths, headers, etags, readers=READERS, duration=DURATION):
+    stats = {"latencies": [], "bytes": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=reader, args=(port, paths, headers, etags, deadline, stats, lock))
+               for _ in range(readers)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    lat = sorted(stats["latencies"])
+    n = len(lat)
+    return {
+        "requests": n,
+        "rps": round(n / elapsed, 1),
+        "p50_ms": round(lat[n // 2] * 1000, 2) if n else None,
+        "p99_ms": round(lat[min(n - 1, int(n * 0.99))] * 1000, 2) if n else None,
+        "kb_per_request": round(stats["bytes"] / max(1, n) / 1024, 2),
+        "egress_mb_s": round(stats["bytes"] / elapsed / 1e6, 2),
+        "errors": stats["errors"],
+    }
+
+
+def current_etags(port, paths):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    etags = {}
+    for path in paths:
+        conn.request("HEAD", path, headers={"Accept-Encoding": "gzip"})
+        resp = conn.getresponse()
+        resp.read()
+        etags[path] = resp.getheader("ETag")
+    conn.close()
+    return etags
+
+
+def main():
+    args = sys.argv[1:]
+    as_json = "--json" in args
+    readers = int(args[args.index("--readers") + 1]) if "--readers" in args else READERS
+    duration = float(args[args.index("--duration") + 1]) if "--duration" in args else DURATION
+    paths = feed_paths()
+
+    servers = {kind: start_server(kind) for kind in ("static", "feed")}
+    results = []
+    try:
+        etags = current_etags(servers["feed"][1], paths)
+        for name, kind, headers in SCENARIOS:
+            result = run_scenario(servers[kind][1], paths, headers, etags, readers, duration)
+            results.append({"scenario": name, **result})
+    finally:
+        for proc, _ in servers.values():
+            proc.kill()
+
+    if as_json:
+        print(json.dumps({"readers": readers, "feeds": len(paths), "results": results}, indent=2))
+        return
+    print(f"{readers} concurrent readers cycling through {len(paths)} feeds, {duration:.0f}s per scenario")
+    print(f"{'scenario':<28}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'KB/req':>9}{'MB/s out':>10}")
+    for r in results:
+        print(f"{r['scenario']:<28}{r['rps']:>9.0f}{r['p50_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+              f"{r['kb_per_request']:>9.2f}{r['egress_mb_s']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
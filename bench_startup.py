@@ -0,0 +1,100 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNS = 5            # best of N cold starts per generator
+TOP_IMPORTS = 3     # heaviest direct imports listed per generator
+
+GENERATORS = [
+    "dhan_scanx_rss",
+    "stockwatch_rss",
+    "capitalmarket_rss",
+    "skicapital_scraper",
+    "whalesbook_rss",
+    "trendlyne_to_rss",
+    "marketsmojo_rss",
+    "buzzing_stocks_rss",
+    "mc_bulk_deals",
+]
+
+# "import time:       self [us] |  cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def parse_importtime(stderr):
+    """(depth, module, self_us, cumulative_us) for every line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_LINE.match(line)
+        if m:
+            rows.append((len(m.group(3)) // 2, m.group(4), int(m.group(1)), int(m.group(2))))
+    return rows
+
+
+def cold_start(module):
+    """One fresh interpreter importing `module`: (wall seconds, importtime rows)."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-500:]}")
+    return wall, parse_importtime(proc.stderr)
+
+
+def profile(module, runs=RUNS):
+    """Best-of-`runs` cold-start numbers for one module."""
+    best = None
+    for _ in range(runs):
+        wall, rows = cold_start(module)
+        own = [r for r in rows if r[1] == module and r[0] == 0]
+        import_us = own[-1][3] if own else 0
+        if best is None or import_us < best["import_ms"] * 1000:
+            # Direct imports of the module are the depth-1 rows printed before it
+            end = rows.index(own[-1]) if own else len(rows)
+            start = end
+            while start > 0 and rows[start - 1][0] > 0:
+                start -= 1
+            direct = sorted((r for r in rows[start:end] if r[0] == 1), key=lambda r: -r[3])
+            best = {
+                "module": module,
+                "import_ms": round(import_us / 1000, 2),
+                "process_ms": round(wall * 1000, 2),
+                "heaviest": [{"module": r[1], "ms": round(r[3] / 1000, 2)} for r in direct[:TOP_IMPORTS]],
+            }
+        else:
+            best["process_ms"] = min(best["process_ms"], round(wall * 1000, 2))
+    return best
+
+
+def baseline(runs=RUNS):
+    """Process time of an interpreter that imports nothing, for comparison."""
+    return min(cold_start("sys")[0] for _ in range(runs)) * 1000
+
+
+def main():
+    as_json = "--json" in sys.argv[1:]
+    modules = [a for a in sys.argv[1:] if not a.startswith("--")] or GENERATORS
+    results = [profile(m) for m in modules]
+    base_ms = round(baseline(), 2)
+
+    if as_json:
+        print(json.dumps({"baseline_process_ms": base_ms, "generators": results}, indent=2))
+        return
+
+    print(f"Interpreter baseline: {base_ms:.1f} ms (best of {RUNS})")
+    print(f"{'generator':<22}{'import ms':>11}{'process ms':>12}  heaviest direct imports")
+    for r in sorted(results, key=lambda r: -r["import_ms"]):
+        heavy = ", ".join(f"{h['module']} {h['ms']:.1f}" for h in r["heaviest"])
+        print(f"{r['module']:<22}{r['import_ms']:>11.1f}{r['process_ms']:>12.1f}  {heavy}")
+
+
+if __name__ == "__main__":
+    main()
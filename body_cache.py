@@ -0,0 +1,81 @@
+import json
+import os
+import threading
+import time
+
+# ================== CONFIG ==================
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+DEFAULT_TTL = 7 * 24 * 3600       # seconds an extracted body stays valid
+DEFAULT_MAX_ENTRIES = 2000        # bodies kept per cache file
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024  # total body text kept per cache file
+
+
+class BodyCache:
+    """On-disk cache of extracted article bodies, keyed by a stable item ID.
+
+    Entries expire after `ttl` seconds. When the cache grows past
+    `max_entries` or `max_bytes`, the least recently used entries are
+    dropped on save. Safe to use from worker threads.
+    """
+
+    def __init__(self, name, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, cache_dir=CACHE_DIR):
+        self.path = os.path.join(cache_dir, f"bodies-{name}.json")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {k: v for k, v in entries.items() if now - v.get("stored", 0) < self.ttl}
+
+    def get(self, key):
+        """Cached body for `key`, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry["stored"] >= self.ttl:
+                self.misses += 1
+                return None
+            entry["used"] = time.time()
+            self.hits += 1
+            return entry["body"]
+
+    def set(self, key, body):
+        """Store a body; empty bodies are not cached so they get retried."""
+        if not body:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {"body": body, "stored": now, "used": now}
+
+    def _evict(self):
+        by_age = sorted(self._entries.items(), key=lambda kv: kv[1]["used"], reverse=True)
+        kept, size = {}, 0
+        for key, entry in by_age:
+            size += len(entry["body"])
+            if len(kept) >= self.max_entries or size > self.max_bytes:
+                break
+            kept[key] = entry
+        self._entries = kept
+
+    def save(self):
+        """Evict down to the size limits and write the cache atomically."""
+        with self._lock:
+            self._evict()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+
+    def stats(self):
+        return f"{self.hits} cached, {self.misses} fetched, {len(self._entries)} stored"
@@ -1,13 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
+import http_client
 from datetime import datetime
-import xml.etree.ElementTree as ET
 import hashlib
-import sys
+import http_cache
+import feed_writer
+import html_extract
+import run_metrics
 
 URL = "https://www.moneycontrol.com/news/tags/buzzing-stocks.html"
 OUT_FILE = "buzzing_stocks.xml"
 
+CHANNEL = {
+    "title": "Moneycontrol – Buzzing Stocks",
+    "link": URL,
+    "description": "Latest Buzzing Stocks news from Moneycontrol (HTML-scraped)",
+    "language": "en-IN",
+}
+
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -24,37 +32,45 @@ HEADERS = {
     "Upgrade-Insecure-Requests": "1",
 }
 
-session = requests.Session()
-session.headers.update(HEADERS)
+session = http_client.Session(HEADERS, name="buzzing_stocks")
+metrics = run_metrics.recorder("buzzing_stocks")
+
+# Compiled once on first use (see html_extract)
+NEWS_LINKS = html_extract.XPath("//a[contains(@href, '/news/')]")
 
 def fetch_articles():
-    r = session.get(URL, timeout=30)
+    r = http_cache.get(URL, session=session, timeout=30, output=OUT_FILE)
 
     if r.status_code == 403:
         print("❌ 403 Forbidden – Moneycontrol blocked this IP")
         print("👉 This WILL happen on GitHub Actions sometimes")
         print("👉 Run locally OR use a proxy / self-hosted runner")
-        sys.exit(0)
+        return [], None
 
     r.raise_for_status()
 
-    soup = BeautifulSoup(r.text, "html.parser")
-    articles = []
+    if r.not_modified:
+        print("Page unchanged since last run; feed left as is.")
+        return None, None
+
+    with metrics.stage("parse"):
+        doc = html_extract.parse(r.text)
+        articles = []
 
-    for a in soup.select("a[href*='/news/']"):
-        title = a.get_text(strip=True)
-        link = a.get("href")
+        for a in NEWS_LINKS(doc):
+            title = html_extract.text(a)
+            link = a.get("href")
 
-        if not title or not link:
-            continue
+            if not title or not link:
+                continue
 
-        if not link.startswith("http"):
-            link = "https://www.moneycontrol.com" + link
+            if not link.startswith("http"):
+                link = "https://www.moneycontrol.com" + link
 
-        if len(title) < 30:
-            continue
+            if len(title) < 30:
+                continue
 
-        articles.append((title, link))
+            articles.append((title, link))
 
     seen = set()
     clean = []
@@ -63,47 +79,38 @@ def fetch_articles():
             seen.add(link)
             clean.append((title, link))
 
-    return clean[:25]
+    return clean[:25], r.cache_entry
 
 def build_rss(items):
-    rss = ET.Element("rss", version="2.0")
-    channel = ET.SubElement(rss, "channel")
-
-    ET.SubElement(channel, "title").text = "Moneycontrol – Buzzing Stocks"
-    ET.SubElement(channel, "link").text = URL
-    ET.SubElement(channel, "description").text = (
-        "Latest Buzzing Stocks news from Moneycontrol (HTML-scraped)"
-    )
-    ET.SubElement(channel, "language").text = "en-IN"
-    ET.SubElement(channel, "lastBuildDate").text = (
-        datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")
+    now = datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")
+    rss_items = (
+        {
+            "title": title,
+            "link": link,
+            "guid": hashlib.md5(link.encode()).hexdigest(),
+            "pubDate": now,
+        }
+        for title, link in items
     )
 
-    for title, link in items:
-        item = ET.SubElement(channel, "item")
-        ET.SubElement(item, "title").text = title
-        ET.SubElement(item, "link").text = link
-        ET.SubElement(item, "guid").text = hashlib.md5(link.encode()).hexdigest()
-        ET.SubElement(item, "pubDate").text = (
-            datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S GMT")
-        )
-
-    ET.ElementTree(rss).write(
-        OUT_FILE,
-        encoding="utf-8",
-        xml_declaration=True
-    )
+    # pubDate is the build time, so re-seen articles keep their first one
+    feed_writer.write_feed(OUT_FILE, CHANNEL, rss_items, keep_first_seen=True, metrics=metrics)
 
+@metrics.run
 def main():
     print("Fetching Buzzing Stocks…")
-    items = fetch_articles()
+    items, cache_entry = fetch_articles()
+
+    if items is None:
+        return
 
     if not items:
         print("⚠️ No articles found (blocked or page changed)")
-        sys.exit(0)
+        return
 
     print(f"Found {len(items)} articles")
     build_rss(items)
+    http_cache.commit(cache_entry)
     print(f"RSS written to: {OUT_FILE}")
 
 if __name__ == "__main__":
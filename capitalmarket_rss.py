@@ -1,7 +1,14 @@
-import requests
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from html import unescape
+from urllib.parse import urlsplit
+from body_cache import BodyCache
+import http_client
+import http_cache
+import feed_writer
+import html_extract
+import run_metrics
 
 # ================== CONFIG ==================
 API_URL = "https://api.capitalmarket.com/api/CmLiveNewsHome/A/20"
@@ -19,6 +26,30 @@ HEADERS_PAGE = {
     "Referer": "https://www.capitalmarket.com/"
 }
 
+CHANNEL = {
+    "title": "Capital Market - Live News",
+    "link": BASE_ITEM_URL,
+    "description": "Latest market news and updates from Capital Market",
+    "language": "en-us",
+    "self_link": BASE_ITEM_URL,
+}
+
+# Article bodies are fetched in parallel over one keep-alive session
+MAX_PER_HOST = 4        # concurrent fetches against any single host
+BODY_WORKERS = MAX_PER_HOST  # every article page is on one host; more workers would only wait
+BODY_TIMEOUT = 15       # per page; not retried, a missing body is fetched next run
+# Article pages are streamed only up to the end of the divtxt body
+MAX_BODY_BYTES = 512 * 1024  # per page; a body not found by then is skipped
+
+session = http_client.Session(name="capitalmarket", pool_maxsize=BODY_WORKERS)
+metrics = run_metrics.recorder("capitalmarket")
+
+# Extracted bodies are reused across runs; only new SNOs hit the site
+body_cache = BodyCache("capitalmarket")
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
 # ================= HELPERS ==================
 def create_slug(text: str) -> str:
     if not text:
@@ -29,73 +60,67 @@ def create_slug(text: str) -> str:
     text = text.strip('-')
     return text or "news"
 
-def extract_divtxt(html: str) -> str:
-    """Inner HTML of <div id='divtxt' class='memo-content'>...</div>."""
-    m = re.search(
-        r'<div[^>]+id=["\']divtxt["\'][^>]*class=["\']memo-content["\'][^>]*>(.*?)</div>',
-        html,
-        flags=re.I | re.S,
-    )
-    if not m:
-        return ""
-    return m.group(1)
-
-def html_to_text(html: str) -> str:
-    if not html:
-        return ""
-    html = re.sub(r'<br\s*/?>', ' ', html, flags=re.I)
-    text = re.sub(r'<[^>]+>', ' ', html)
-    text = unescape(text)
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
 def first_sentence(text: str) -> str:
     if not text:
         return ""
     parts = re.split(r'(?<=[\.\!\?])\s+', text, maxsplit=1)
     return parts[0].strip()
 
-# ================= MAIN ==================
-def fetch_cm_news():
-    print("Connecting to Capital Market API...")
-    r = requests.get(API_URL, headers=HEADERS_API, timeout=15)
-    r.raise_for_status()
-    data = r.json()
-    if not data.get("success"):
-        print("API not successful")
-        return
-
-    articles = data.get("data", [])
-    if not articles:
-        print("No articles")
-        return
-
-    items_xml = ""
-
-    for art in articles:
-        if not isinstance(art, dict):
-            continue
-
+def host_limit(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(MAX_PER_HOST)
+        return _host_limits[host]
+
+def fetch_body(link: str, sno: str):
+    """(plain-text article body, bytes of the page read); the body is "" if
+    the page is slow, missing or broken.
+
+    The page is streamed and the connection dropped once the divtxt body
+    has been parsed, so the comments, scripts and footer after it are not
+    downloaded.
+    """
+    try:
+        with host_limit(link):
+            pr = session.get(link, headers=HEADERS_PAGE, timeout=BODY_TIMEOUT,
+                             max_retries=0, stream=True)
+            if not pr.ok:
+                pr.close()
+                return "", 0
+            body, read = html_extract.stream_element(pr, "divtxt", max_bytes=MAX_BODY_BYTES)
+        metrics.count("bytes", read)
+        return html_extract.text(body), read
+    except Exception as e:
+        print(f"Body fetch failed for {sno}: {e}")
+    return "", 0
+
+def fetch_bodies(jobs) -> list:
+    """Bodies for (link, sno) pairs, from the cache or fetched concurrently.
+    Results keep the input order."""
+    bodies = [body_cache.get(f"cm-{sno}") for _, sno in jobs]
+    missing = [i for i, body in enumerate(bodies) if body is None]
+    bytes_read = 0
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(BODY_WORKERS, len(missing))) as pool:
+            for i, (body, read) in zip(missing, pool.map(lambda i: fetch_body(*jobs[i]), missing)):
+                bodies[i] = body
+                bytes_read += read
+                body_cache.set(f"cm-{jobs[i][1]}", body)
+    body_cache.save()
+    metrics.count("body_cache_hits", len(jobs) - len(missing))
+    print(f"Article bodies: {body_cache.stats()}, {bytes_read // 1024} KB of pages read")
+    return bodies
+
+def build_items(articles, links, bodies):
+    """Yield one RSS item dict per article, in API order."""
+    for art, (link, sno), body_text in zip(articles, links, bodies):
         title = art.get("Heading") or "Market Update"
-        sno = str(art.get("SNO") or "0")
         section = art.get("sectionname") or "Market News"
         subsection = art.get("subsectionname") or ""
         img_url = art.get("IllustrationImage") or ""
         caption = art.get("Caption") or ""
 
-        slug = create_slug(title)
-        link = f"{BASE_ITEM_URL}/{slug}/{sno}"
-
-        # -------- fetch article page body --------
-        body_text = ""
-        try:
-            pr = requests.get(link, headers=HEADERS_PAGE, timeout=15)
-            if pr.ok:
-                inner_html = extract_divtxt(pr.text)
-                body_text = html_to_text(inner_html)
-        except Exception as e:
-            print(f"Body fetch failed for {sno}: {e}")
-
         # summary: first sentence of body, else caption/title
         if body_text:
             summary = first_sentence(body_text)
@@ -126,32 +151,55 @@ def fetch_cm_news():
         except Exception:
             pub_rss = datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S +0000")
 
-        items_xml += f"""
-  <item>
-    <title><![CDATA[{title}]]></title>
-    <link>{link}</link>
-    <guid isPermaLink="false">cm-{sno}</guid>
-    <pubDate>{pub_rss}</pubDate>
-    <category>{section}</category>
-    <description><![CDATA[{description}]]></description>
-  </item>"""
-
-    rss_full = f"""<?xml version="1.0" encoding="UTF-8"?>
-<rss xmlns:atom="http://www.w3.org/2005/Atom" version="2.0">
-  <channel>
-    <title>Capital Market - Live News</title>
-    <link>{BASE_ITEM_URL}</link>
-    <description>Latest market news and updates from Capital Market</description>
-    <lastBuildDate>{datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S +0000")}</lastBuildDate>
-    <language>en-us</language>
-    <atom:link href="{BASE_ITEM_URL}" rel="self" type="application/rss+xml" />{items_xml}
-  </channel>
-</rss>"""
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        f.write(rss_full)
-
-    print(f"Saved RSS with {len(articles)} items -> {OUTPUT_FILE}")
+        yield {
+            "title": title,
+            "link": link,
+            "guid": f"cm-{sno}",
+            "permalink": False,
+            "pubDate": pub_rss,
+            "category": section,
+            "description": description,
+        }
+
+# ================= MAIN ==================
+@metrics.run
+def fetch_cm_news():
+    print("Connecting to Capital Market API...")
+    r = http_cache.get(API_URL, session=session, headers=HEADERS_API, timeout=15, output=OUTPUT_FILE)
+    r.raise_for_status()
+    if r.not_modified:
+        print("API response unchanged since last run; feed left as is.")
+        return
+    with metrics.stage("parse"):
+        data = r.json()
+    if not data.get("success"):
+        print("API not successful")
+        return
+
+    articles = data.get("data", [])
+    if not articles:
+        print("No articles")
+        return
+
+    articles = [art for art in articles if isinstance(art, dict)]
+    links = []
+    for art in articles:
+        title = art.get("Heading") or "Market Update"
+        sno = str(art.get("SNO") or "0")
+        links.append((f"{BASE_ITEM_URL}/{create_slug(title)}/{sno}", sno))
+
+    # -------- fetch article page bodies (concurrently, API order kept) --------
+    with metrics.stage("enrich"):
+        bodies = fetch_bodies(links)
+
+    total = feed_writer.write_feed(OUTPUT_FILE, CHANNEL, build_items(articles, links, bodies), metrics=metrics)
+    # Articles that fell back to their caption are retried while the API answer is unchanged
+    if all(bodies):
+        http_cache.commit(r.cache_entry)
+    else:
+        print(f"{sum(not b for b in bodies)} bodies missing; response not cached so they are retried next run")
+
+    print(f"Saved RSS with {len(articles)} new items ({total} total) -> {OUTPUT_FILE}")
 
 if __name__ == "__main__":
     fetch_cm_news()
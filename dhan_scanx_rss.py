@@ -0,0 +1,92 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+import feed_writer
+import run_metrics
+
+# ================== CONFIG ==================
+API_URL = "https://news-live.dhan.co/news/getlatestarticlelist"
+IMG_BASE = "https://news-images.dhan.co/"
+NEWS_BASE = "https://scanx.trade/stock-market-news"
+
+HEADERS = {
+    "accept": "application/json, text/plain, */*",
+    "content-type": "application/json",
+    "origin": "https://scanx.trade",
+    "auth": "null",
+}
+
+# (output file, feed title, API category, scanx.trade section used in links)
+# The combined feed asks the API for every category at once.
+COMBINED_FEED = ("dhan-scanx-news.xml", "Dhan / ScanX Latest News (Personal)", "all", "stocks")
+FEEDS = [
+    ("scanx_stock_news.xml", "ScanX – Stock News", "stocks", "stocks"),
+    ("scanx_corporate_actions.xml", "ScanX – Corporate Actions", "corporate-actions", "corporate-actions"),
+    ("scanx_earnings.xml", "ScanX – Earnings", "earnings", "earnings"),
+    ("scanx_orders_deals.xml", "ScanX – Orders & Deals", "orders-deals", "orders-deals"),
+    ("scanx_global.xml", "ScanX – Global", "global", "global"),
+    ("scanx_markets.xml", "ScanX – Markets", "markets", "markets"),
+    ("scanx_ipo_news.xml", "ScanX – IPO News", "ipo", "ipo"),
+]
+
+session = http_client.Session(HEADERS, name="dhan", pool_maxsize=len(FEEDS) + 1)
+metrics = run_metrics.recorder("dhan")
+
+
+def create_slug(text):
+    """Same SEO slug scanx.trade uses in article URLs."""
+    slug = (text or "").lower()
+    slug = re.sub(r"[^a-z0-9\s-]", "", slug)
+    slug = re.sub(r"\s+", "-", slug)
+    return slug.strip("-")
+
+
+def fetch_articles(category):
+    """Latest articles for one API category; [] on any failure."""
+    try:
+        resp = session.post(API_URL, json={"category": category, "subcategory": "all"}, timeout=20)
+        resp.raise_for_status()
+        with metrics.stage("parse"):
+            data = resp.json().get("data") or {}
+        return (data.get("Articlelist") or {}).get("Articles") or []
+    except Exception as e:
+        print(f"❌ {category}: {e}")
+        return []
+
+
+def build_items(section, articles):
+    # The API gives no publish time; the item store keeps the first time we saw each item
+    now = feed_writer.rfc822_now()
+    for art in articles:
+        headline = (art.get("articletitle") or "").strip()
+        if not headline or not art.get("id"):
+            continue
+        link = f"{NEWS_BASE}/{section}/{create_slug(headline)}/{art['id']}"
+        item = {"title": headline, "link": link, "guid": link, "permalink": True, "pubDate": now}
+        if art.get("imageurl"):
+            item["description"] = f'<img src="{IMG_BASE}{art["imageurl"]}" /><br/>'
+        yield item
+
+
+@metrics.run
+def main():
+    feeds = [COMBINED_FEED] + FEEDS
+    print(f"Fetching {len(feeds)} ScanX categories concurrently...")
+    with ThreadPoolExecutor(max_workers=len(feeds)) as pool:
+        results = list(pool.map(lambda feed: fetch_articles(feed[2]), feeds))
+
+    for (out_file, title, category, section), articles in zip(feeds, results):
+        if not articles:
+            print(f"⚠️ {category}: no articles, {out_file} not updated")
+            continue
+        channel = {
+            "title": title,
+            "link": NEWS_BASE,
+            "description": "Personal wrapper around Dhan/ScanX news.",
+        }
+        total = feed_writer.write_feed(out_file, channel, build_items(section, articles), keep_first_seen=True, metrics=metrics)
+        print(f"✅ {out_file}: {len(articles)} fetched, {total} in feed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time as dtime
+
+import feed_engine
+import feed_master
+import feed_merge
+import run_metrics
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = os.path.join(BASE_DIR, ".cache", "daemon-state.json")
+MAX_CONCURRENCY = feed_engine.MAX_CONCURRENCY
+
+# NSE cash market session, Monday to Friday (exchange holidays are not known here)
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+
+# (shortest, longest) poll interval in seconds, during and outside market hours
+MARKET_INTERVALS = (60, 15 * 60)
+OFF_HOURS_INTERVALS = (5 * 60, 60 * 60)
+BLOCKED_MAX_INTERVAL = 2 * 60 * 60  # backoff cap after 403/429 or a failed run
+
+TARGET_NEW_PER_POLL = 2  # aim to pick up about this many new items per poll
+RATE_SMOOTHING = 0.3     # weight of the latest poll in the arrival-rate average
+POST_DEBOUNCE = 15       # seconds to wait for more changed sources before the post stages
+
+# Feeds each source of feed_engine.SOURCES writes; a poll counts new GUIDs in these
+SOURCE_FEEDS = {
+    "dhan scanx feeds": ("dhan-scanx-news.xml", "scanx_stock_news.xml", "scanx_corporate_actions.xml",
+                         "scanx_earnings.xml", "scanx_orders_deals.xml", "scanx_global.xml",
+                         "scanx_markets.xml", "scanx_ipo_news.xml"),
+    "stockwatch feed": ("stockwatch-feed.xml",),
+    "capitalmarket feed": ("capital-market-news.xml",),
+    "skicapital feed": ("skicapital_news.xml",),
+    "whalesbook feed": ("whalesbook-news.xml",),
+    "trendlyne feed": ("trendlyne-news.xml",),
+    "marketsmojo feed": ("marketsmojo_news.xml",),
+    "buzzing stocks feed": ("buzzing_stocks.xml",),
+    "bulk deals feed": ("bulk-deals.xml",),
+}
+
+# (name, module, entry point, timeout in seconds, feeds it writes)
+SOURCES = [(*source, SOURCE_FEEDS[source[0]]) for source in feed_engine.SOURCES]
+
+
+def market_open(now=None):
+    """True during NSE trading hours (IST, weekdays)."""
+    now = (now or datetime.now(feed_master.IST)).astimezone(feed_master.IST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def interval_bounds(now=None):
+    return MARKET_INTERVALS if market_open(now) else OFF_HOURS_INTERVALS
+
+
+def feed_keys(path):
+    return {key for key in map(feed_merge.item_key, feed_merge.iter_items(path)) if key}
+
+
+def feed_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class PollState:
+    """Poll schedule of one source.
+
+    The interval follows the source's observed arrival rate of new GUIDs,
+    smoothed over polls, so that a poll finds about TARGET_NEW_PER_POLL new
+    items. Quiet polls let the rate decay, which at most doubles the
+    interval each time; a 403/429 or a failed run doubles it up to
+    BLOCKED_MAX_INTERVAL. The result is kept within the bounds for the
+    current time of day.
+    """
+
+    def __init__(self, name, saved=None):
+        saved = saved or {}
+        self.name = name
+        self.rate = saved.get("rate", 0.0)          # new items per second
+        self.interval = saved.get("interval", interval_bounds()[0])
+        self.blocked = saved.get("blocked", 0)      # consecutive blocked or failed polls
+        self.next_due = 0.0
+        self.last_poll = None
+
+    def update(self, new_items, ok, blocked):
+        now = time.time()
+        low, high = interval_bounds()
+        if not ok or blocked:
+            self.blocked += 1
+            self.interval = min(BLOCKED_MAX_INTERVAL, max(self.interval, low) * 2)
+        else:
+            self.blocked = 0
+            if self.last_poll is None:
+                # The first poll's new items are a backlog, not a rate
+                target = self.interval
+            else:
+                observed = new_items / max(1.0, now - self.last_poll)
+                self.rate = RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * self.rate
+                target = TARGET_NEW_PER_POLL / self.rate if self.rate > 0 else high
+            if not new_items:
+                target = min(target, self.interval * 2)
+            self.interval = min(high, max(low, target))
+        self.last_poll = now
+        self.next_due = now + self.interval
+
+    def to_json(self):
+        return {"rate": self.rate, "interval": self.interval, "blocked": self.blocked}
+
+
+class FeedDaemon:
+    """Keeps every source imported, with its HTTP session and caches warm,
+    and polls each one on its own schedule (see PollState).
+
+    The generators only rewrite a feed whose item set changed; the post
+    stages (dedup, master and symbol feeds) run once after a burst of
+    source updates, and only if some feed was actually rewritten.
+    """
+
+    def __init__(self, sources=SOURCES, post_stages=feed_engine.POST_STAGES,
+                 max_concurrency=MAX_CONCURRENCY, state_file=STATE_FILE):
+        self.sources = sources
+        self.post_stages = post_stages
+        self.state_file = state_file
+        self.max_concurrency = max_concurrency
+        saved = self._load_state()
+        self.states = {name: PollState(name, saved.get(name)) for name, *_ in sources}
+        self.keys = {name: set().union(*map(feed_keys, feeds)) for name, _, _, _, feeds in sources}
+        self.changed = None
+        self.executor = None
+        self.limit = None
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({name: st.to_json() for name, st in self.states.items()}, f, indent=1)
+        os.replace(self.state_file + ".tmp", self.state_file)
+
+    async def poll_source(self, name, module_name, func_name, timeout, feeds):
+        """Poll one source forever on its own schedule."""
+        state = self.states[name]
+        module = importlib.import_module(module_name)
+        func = getattr(module, func_name)
+        loop = asyncio.get_running_loop()
+        pending = None
+        while True:
+            await asyncio.sleep(max(0.0, state.next_due - time.time()))
+            # A run that outlived its timeout and wrap-up is still going; never start a second one
+            if pending is not None and not pending.done():
+                state.update(0, ok=False, blocked=False)
+                continue
+
+            # Every poll appends a record; keep the file from growing forever
+            run_metrics.rotate()
+            before = {path: feed_mtime(path) for path in feeds}
+            ok = True
+            async with self.limit:
+                deadline = time.monotonic() + timeout - feed_engine.WRAP_UP
+                pending = feed_engine.run_with_deadline(loop, self.executor, module, func, deadline)
+                try:
+                    await asyncio.wait_for(asyncio.shield(pending), timeout)
+                except asyncio.TimeoutError:
+                    ok = False
+                    print(f"FAILED: {name} => timeout after {timeout}s")
+                except (Exception, SystemExit) as e:
+                    ok = False
+                    print(f"FAILED: {name} => {type(e).__name__}: {e}")
+
+            rewritten = [path for path in feeds if feed_mtime(path) != before[path]]
+            keys = set().union(*map(feed_keys, feeds)) if rewritten else self.keys[name]
+            new_items = len(keys - self.keys[name])
+            self.keys[name] = keys
+            metrics = getattr(module, "metrics", None)
+            blocked = bool(metrics and metrics.counts.get("blocked"))
+
+            state.update(new_items, ok, blocked)
+            self._save_state()
+            print(f"{datetime.now(feed_master.IST):%H:%M:%S} {name}: {new_items} new, "
+                  f"{len(rewritten)} feed(s) rewritten{', blocked' if blocked else ''}; "
+                  f"next poll in {state.interval:.0f}s")
+            if rewritten:
+                self.changed.set()
+
+    async def run_post_stages(self):
+        """Rebuild the derived feeds after sources changed, debounced."""
+        one_at_a_time = asyncio.Semaphore(1)
+        while True:
+            await self.changed.wait()
+            await asyncio.sleep(POST_DEBOUNCE)
+            self.changed.clear()
+            for name, module, func, timeout in self.post_stages:
+                await feed_engine.refresh_source(name, module, func, timeout, self.executor, one_at_a_time)
+
+    async def run(self):
+        self.changed = asyncio.Event()
+        self.limit = asyncio.Semaphore(self.max_concurrency)
+        # One thread per source plus one for the post stages, so a hung scraper
+        # never starves the others
+        self.executor = ThreadPoolExecutor(max_workers=len(self.sources) + 1, thread_name_prefix="poll")
+        try:
+            await asyncio.gather(
+                self.run_post_stages(),
+                *(self.poll_source(*source) for source in self.sources),
+            )
+        finally:
+            self.executor.shutdown(wait=False)
+
+
+def main():
+    # The scrapers write their feeds relative to the working directory
+    os.chdir(BASE_DIR)
+    # --serve: also serve the feeds over HTTP while they are refreshed
+    if "--serve" in sys.argv[1:]:
+        import feed_server
+        server = feed_server.serve_in_background()
+        print(f"Serving feeds on http://{feed_server.HOST}:{server.server_port}/")
+    low, high = interval_bounds()
+    print(f"Feed daemon: {len(SOURCES)} sources, market {'open' if market_open() else 'closed'}, "
+          f"polling every {low}s to {high}s")
+    try:
+        asyncio.run(FeedDaemon().run())
+    except KeyboardInterrupt:
+        print("Feed daemon stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from html import unescape
+
+import feed_master
+import feed_merge
+import feed_writer
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(BASE_DIR, ".cache", "dedup-index.json")
+OUT_FILE = "unique-news.xml"
+
+NUM_PERM = 64          # MinHash signature length
+BANDS = 16             # LSH bands of NUM_PERM // BANDS rows; candidates share a whole band
+THRESHOLD = 0.65       # estimated Jaccard similarity at which two items are one story
+SUMMARY_WORDS = 30     # leading words of the summary fingerprinted with the title
+MAX_AGE_DAYS = feed_merge.MAX_AGE_DAYS  # index entries older than this are forgotten
+MAX_ITEMS = feed_merge.MAX_ITEMS        # stories in the feed, newest first
+
+# (feed file, source label); feeds sharing a label are one source
+SOURCES = [
+    ("dhan-scanx-news.xml", "Dhan ScanX"),
+    ("scanx_stock_news.xml", "Dhan ScanX"),
+    ("scanx_corporate_actions.xml", "Dhan ScanX"),
+    ("scanx_earnings.xml", "Dhan ScanX"),
+    ("scanx_orders_deals.xml", "Dhan ScanX"),
+    ("scanx_global.xml", "Dhan ScanX"),
+    ("scanx_markets.xml", "Dhan ScanX"),
+    ("scanx_ipo_news.xml", "Dhan ScanX"),
+    ("stockwatch-feed.xml", "Stockwatch"),
+    ("capital-market-news.xml", "Capital Market"),
+    ("skicapital_news.xml", "SKI Capital"),
+    ("whalesbook-news.xml", "Whalesbook"),
+    ("trendlyne-news.xml", "Trendlyne"),
+    ("marketsmojo_news.xml", "MarketsMojo"),
+    ("buzzing_stocks.xml", "Moneycontrol"),
+]
+
+CHANNEL = {
+    "title": "Indian Market News – one item per story",
+    "description": "All feeds of this repository with cross-source near-duplicates folded into one item",
+    "language": "en-IN",
+}
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or the to was were will with".split()
+)
+TAG = re.compile(r"<[^>]+>")
+# scanx.trade links end in the article id; the section before it differs between the Dhan feeds
+SCANX_ARTICLE = re.compile(r"^https?://scanx\.trade/stock-market-news/.+/(\d+)/?$")
+WORD = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+# Hash family h(x) = (a*x + b) mod P, fixed so signatures stay comparable across runs
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20260517)
+_PERMS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_ROWS = NUM_PERM // BANDS
+
+
+def tokens(item):
+    """Normalized word set of an item's title and the lead of its summary."""
+    title = unescape(TAG.sub(" ", item.get("title") or "")).lower()
+    summary = unescape(TAG.sub(" ", item.get("description") or "")).lower()
+    words = WORD.findall(title) + WORD.findall(summary)[:SUMMARY_WORDS]
+    return {w for w in words if w not in STOPWORDS}
+
+
+def minhash(words):
+    """MinHash signature of a word set (None for an empty set)."""
+    if not words:
+        return None
+    hashes = [int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=8).digest(), "little")
+              for w in words]
+    # 32 bits per slot are plenty to tell values apart and keep the index small
+    return [min((a * x + b) % _PRIME for x in hashes) & 0xFFFFFFFF for a, b in _PERMS]
+
+
+def entry_key(source, item):
+    """Index key of an item: one per article of a source, whichever of the
+    source's feeds carries it."""
+    key = feed_merge.item_key(item)
+    article = SCANX_ARTICLE.match(key)
+    return f"{source}|scanx-{article.group(1)}" if article else f"{source}|{key}"
+
+
+def similarity(sig1, sig2):
+    """Jaccard similarity estimated from two signatures."""
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / NUM_PERM
+
+
+def _bands(sig):
+    return [(band,) + tuple(sig[band * _ROWS:(band + 1) * _ROWS]) for band in range(BANDS)]
+
+
+class DedupIndex:
+    """Persisted MinHash fingerprints of every item seen, grouped into stories.
+
+    A story is named after the key of the first item reported for it. New
+    items are looked up through LSH band buckets, so a lookup only compares
+    against the few items that share a band rather than the whole index.
+    Near-duplicates are only matched across sources; a source's own
+    templated headlines never fold into each other.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self.entries = {}
+        self.buckets = {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+        for key, entry in self.entries.items():
+            if entry.get("sig"):
+                self._bucket(key, entry["sig"])
+
+    def _bucket(self, key, sig):
+        for band in _bands(sig):
+            self.buckets.setdefault(band, []).append(key)
+
+    def match(self, source, sig):
+        """Story of the most similar item from another source, or None."""
+        best, best_sim = None, THRESHOLD
+        seen = set()
+        for band in _bands(sig):
+            for key in self.buckets.get(band, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                entry = self.entries[key]
+                if entry["source"] == source:
+                    continue
+                sim = similarity(sig, entry["sig"])
+                if sim >= best_sim:
+                    best, best_sim = entry["story"], sim
+        return best
+
+    def story(self, source, item):
+        """Story key for an item, indexing it on first sight."""
+        key = entry_key(source, item)
+        entry = self.entries.get(key)
+        if entry is None:
+            sig = minhash(tokens(item))
+            story = (sig and self.match(source, sig)) or key
+            entry = {"source": source, "title": item.get("title", ""), "sig": sig, "story": story}
+            self.entries[key] = entry
+            if sig:
+                self._bucket(key, sig)
+        entry["seen"] = time.time()
+        return entry["story"]
+
+    def save(self, max_age_days=MAX_AGE_DAYS):
+        cutoff = time.time() - max_age_days * 86400
+        live = {k: e for k, e in self.entries.items() if e.get("seen", 0) >= cutoff}
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(live, f, separators=(",", ":"))
+        os.replace(self.path + ".tmp", self.path)
+
+
+def read_sources(sources=SOURCES):
+    """(source, item) for every dated item of every feed, oldest first, with
+    pubDates in UTC (see feed_master.source_items)."""
+    zones = {path: zone for path, _, zone in feed_master.SOURCES}
+    items = [
+        (source, item)
+        for path, source in sources
+        for item in feed_master.source_items(path, source, zones.get(path))
+    ]
+    items.sort(key=lambda si: feed_merge.item_timestamp(si[1]))
+    return items
+
+
+def unique_items(stories):
+    """One item per story: its first report, annotated with the other sources."""
+    for story, members in stories.items():
+        first_source, first = next(
+            ((s, i) for s, i in members if entry_key(s, i) == story), members[0]
+        )
+        others = sorted({s for s, _ in members} - {first_source})
+        item = dict(first)
+        if others:
+            note = f"<p>Also reported by: {', '.join(others)}</p>"
+            item["description"] = (item.get("description") or "") + note
+        yield item
+
+
+def main():
+    index = DedupIndex()
+    stories = {}
+    items = read_sources()
+    for source, item in items:
+        if feed_merge.item_key(item):
+            stories.setdefault(index.story(source, item), []).append((source, item))
+    index.save()
+
+    folded = sum(len({s for s, _ in m}) - 1 for m in stories.values())
+    print(f"Dedup: {len(items)} items -> {len(stories)} stories ({folded} cross-source copies folded)")
+    # A view over the source feeds, like all-news.xml: written as is, not stored
+    items = sorted(unique_items(stories), key=feed_merge.sort_key)[:MAX_ITEMS]
+    feed_writer.write_items(OUT_FILE, feed_writer.published(CHANNEL, OUT_FILE), items)
+
+
+if __name__ == "__main__":
+    main()
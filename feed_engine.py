@@ -0,0 +1,161 @@
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import http_client
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_CONCURRENCY = 8      # sources refreshed at the same time
+DEFAULT_TIMEOUT = 90     # seconds per source unless overridden below
+WRAP_UP = 10             # seconds of a source's timeout kept for writing what it fetched
+
+# (name, module, entry point, timeout in seconds)
+# Every entry point is a plain function that fetches, parses and writes its feed.
+SOURCES = [
+    ("dhan scanx feeds", "dhan_scanx_rss", "main", DEFAULT_TIMEOUT),
+    ("stockwatch feed", "stockwatch_rss", "fetch_stockwatch_news", DEFAULT_TIMEOUT),
+    ("capitalmarket feed", "capitalmarket_rss", "fetch_cm_news", 180),
+    ("skicapital feed", "skicapital_scraper", "main", 300),
+    ("whalesbook feed", "whalesbook_rss", "main", DEFAULT_TIMEOUT),
+    ("trendlyne feed", "trendlyne_to_rss", "fetch_and_build_rss", DEFAULT_TIMEOUT),
+    ("marketsmojo feed", "marketsmojo_rss", "main", DEFAULT_TIMEOUT),
+    ("buzzing stocks feed", "buzzing_stocks_rss", "main", DEFAULT_TIMEOUT),
+    ("bulk deals feed", "mc_bulk_deals", "main", DEFAULT_TIMEOUT),
+]
+
+# Stages that read the feeds above, run in order once every source is done
+# (name, module, entry point, timeout in seconds)
+POST_STAGES = [
+    ("dedup stage", "feed_dedup", "main", DEFAULT_TIMEOUT),
+    ("master feed", "feed_master", "main", DEFAULT_TIMEOUT),
+    ("symbol feeds", "symbol_feeds", "main", DEFAULT_TIMEOUT),
+    ("search feeds", "search_feeds", "main", DEFAULT_TIMEOUT),
+]
+
+# Sources that are not Python modules still run as child processes
+# (name, command, timeout in seconds)
+EXTERNAL_SOURCES = []
+
+def _result(name):
+    return {"name": name, "ok": False, "status": "failed",
+            "returncode": None, "seconds": 0.0, "error": None}
+
+
+async def refresh_source(name, module_name, func_name, timeout, executor, limit):
+    """Import a source once and run its entry point on the engine's worker pool.
+
+    The scrapers use blocking ``requests`` calls, so each one is handed to a
+    worker thread; the event loop only schedules them and enforces timeouts.
+    A thread cannot be interrupted, so the source's HTTP session is given a
+    deadline WRAP_UP seconds before the timeout instead (see
+    http_pool.set_deadline): past it, its requests fail at once and the
+    entry point writes what it has and returns. If it still overruns, it
+    gets WRAP_UP more seconds before the engine moves on without it.
+    """
+    result = _result(name)
+    async with limit:
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        pending = None
+        try:
+            module = importlib.import_module(module_name)
+            func = getattr(module, func_name)
+            pending = run_with_deadline(loop, executor, module, func, start + timeout - WRAP_UP)
+            await asyncio.wait_for(asyncio.shield(pending), timeout)
+            result["ok"] = True
+            result["status"] = "ok"
+            print("OK:", name)
+        except asyncio.TimeoutError:
+            result["status"] = "timeout"
+            result["error"] = f"timeout after {timeout}s"
+            print("FAILED:", name, "=>", result["error"])
+            await asyncio.wait([pending], timeout=WRAP_UP)
+            if not pending.done():
+                print(f"WARNING: {name} still running {WRAP_UP}s after its timeout")
+        except (Exception, SystemExit) as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            print("FAILED:", name, "=>", result["error"])
+        result["seconds"] = round(time.monotonic() - start, 3)
+    return result
+
+
+def run_with_deadline(loop, executor, module, func, deadline):
+    """Run `func` on `executor` with the HTTP session of `module` (named like
+    its run_metrics recorder) stopped at monotonic time `deadline`."""
+    metrics = getattr(module, "metrics", None)
+    if metrics is None:
+        return loop.run_in_executor(executor, func)
+    import http_pool
+    http_pool.set_deadline(metrics.name, deadline)
+    pending = loop.run_in_executor(executor, func)
+    # Cleared only once the entry point has returned, however late
+    pending.add_done_callback(lambda _: http_pool.set_deadline(metrics.name, None))
+    return pending
+
+
+async def refresh_external(name, cmd, timeout, limit):
+    """Run a non-Python generator as a child process without blocking the loop."""
+    result = _result(name)
+    result["command"] = cmd
+    async with limit:
+        start = time.monotonic()
+        proc = None
+        try:
+            proc = await asyncio.create_subprocess_exec(*cmd, cwd=BASE_DIR)
+            result["returncode"] = await asyncio.wait_for(proc.wait(), timeout)
+            if result["returncode"] == 0:
+                result["ok"] = True
+                result["status"] = "ok"
+                print("OK:", name)
+            else:
+                result["error"] = f"exit code: {result['returncode']}"
+                print("FAILED:", name, "=>", result["error"])
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            result["status"] = "timeout"
+            result["error"] = f"timeout after {timeout}s"
+            print("FAILED:", name, "=>", result["error"])
+        except FileNotFoundError as e:
+            result["error"] = f"file not found: {e}"
+            print("FAILED:", name, "=> file not found:", e)
+        result["seconds"] = round(time.monotonic() - start, 3)
+    return result
+
+
+async def refresh_all(sources=SOURCES, external=EXTERNAL_SOURCES, max_concurrency=MAX_CONCURRENCY,
+                      post_stages=POST_STAGES):
+    """Refresh every source on one event loop, then run the post stages one
+    at a time; results come back in list order."""
+    limit = asyncio.Semaphore(max_concurrency)
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="feed")
+    try:
+        jobs = [refresh_external(name, cmd, timeout, limit) for name, cmd, timeout in external]
+        jobs += [
+            refresh_source(name, module, func, timeout, executor, limit)
+            for name, module, func, timeout in sources
+        ]
+        results = list(await asyncio.gather(*jobs))
+        one_at_a_time = asyncio.Semaphore(1)
+        for name, module, func, timeout in post_stages:
+            results.append(await refresh_source(name, module, func, timeout, executor, one_at_a_time))
+        return results
+    finally:
+        executor.shutdown(wait=False)
+
+
+def run(max_concurrency=MAX_CONCURRENCY):
+    """Refresh everything once."""
+    # The scrapers write their feeds relative to the working directory
+    os.chdir(BASE_DIR)
+    results = asyncio.run(refresh_all(max_concurrency=max_concurrency))
+    http_client.report()
+    return results
+
+
+if __name__ == "__main__":
+    for r in run():
+        print(f"{r['status']:>8}  {r['seconds']:>8.2f}s  {r['name']}")
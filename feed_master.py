@@ -0,0 +1,101 @@
+import heapq
+import itertools
+from datetime import timedelta, timezone
+
+import feed_merge
+import feed_writer
+
+# ================== CONFIG ==================
+OUT_FILE = "all-news.xml"
+MAX_ITEMS = 500        # items in the master feed
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# (feed file, source label, zone its pubDate clock is really in)
+# A zone is only given for sources that write local wall-clock times with
+# a +0000 label; every other pubDate carries a correct offset already.
+SOURCES = [
+    ("stockwatch-feed.xml", "Stockwatch", None),
+    ("capital-market-news.xml", "Capital Market", IST),
+    ("whalesbook-news.xml", "Whalesbook", None),
+    ("trendlyne-news.xml", "Trendlyne", None),
+    ("skicapital_news.xml", "SKI Capital", None),
+    ("marketsmojo_news.xml", "MarketsMojo", None),
+    ("buzzing_stocks.xml", "Moneycontrol", None),
+    ("bulk-deals.xml", "NSE Bulk Deals", None),
+    ("dhan-scanx-news.xml", "Dhan ScanX", None),
+]
+
+CHANNEL = {
+    "title": "Indian Market News – all sources",
+    "description": "Every news feed of this repository in one feed, newest first",
+    "language": "en-IN",
+}
+
+
+def to_utc(pub_date, wall_zone=None):
+    """An RFC 822 date re-expressed in UTC, or None if it can't be parsed.
+
+    With `wall_zone`, the date's clock time is taken to be in that zone
+    whatever offset it is labelled with.
+    """
+    from email.utils import parsedate_to_datetime
+    try:
+        dt = parsedate_to_datetime(pub_date.strip())
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if wall_zone is not None or dt.tzinfo is None:
+        dt = dt.replace(tzinfo=wall_zone or timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+
+
+def labelled(item, source, wall_zone=None):
+    """`item` with its pubDate in UTC and the source label as category where
+    it has none, or None if it is undated."""
+    utc = to_utc(item.get("pubDate"), wall_zone)
+    if not utc:
+        return None
+    item["pubDate"] = utc
+    item.setdefault("category", source)
+    return item
+
+
+def source_items(path, source, wall_zone=None):
+    """Stream a source feed's items as labelled() makes them; undated
+    items are dropped.
+
+    Feeds are written newest first, and a fixed shift of every date keeps
+    that order, so the stream stays sorted for merging.
+    """
+    for item in feed_merge.iter_items(path):
+        if labelled(item, source, wall_zone) is not None:
+            yield item
+
+
+def merged_items(sources=SOURCES, max_items=MAX_ITEMS):
+    """Newest `max_items` items across all sources, by k-way heap merge.
+
+    Only one pending item per source is held at a time; the merge stops
+    as soon as the cap is reached. An item already emitted (same guid or
+    link) is skipped.
+    """
+    streams = [source_items(path, source, zone) for path, source, zone in sources]
+    seen = set()
+
+    def unseen(items):
+        for item in items:
+            key = feed_merge.item_key(item)
+            if key and key not in seen:
+                seen.add(key)
+                yield item
+
+    return itertools.islice(unseen(heapq.merge(*streams, key=feed_merge.sort_key)), max_items)
+
+
+def main():
+    count = feed_writer.write_items(OUT_FILE, feed_writer.published(CHANNEL, OUT_FILE), merged_items())
+    print(f"Master feed: {count} items from {len(SOURCES)} sources -> {OUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
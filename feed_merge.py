@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import re
+
+# ================== CONFIG ==================
+MAX_ITEMS = 200        # items kept per feed after merging
+MAX_AGE_DAYS = 7       # items older than this drop out of the feed
+
+ITEM_FIELDS = ("title", "link", "guid", "permalink", "pubDate", "category", "description", "enclosure")
+
+# Characters XML 1.0 forbids even when escaped: C0 controls other than tab,
+# newline and carriage return, lone surrogates, U+FFFE and U+FFFF
+XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+LINE_BREAK = re.compile(r"\r\n?")
+ATTR_SPACE = re.compile(r"[\t\n]")  # an XML parser reads these as spaces in attribute values
+
+
+def item_key(item):
+    """Identity of an item: its guid, falling back to the link."""
+    return (item.get("guid") or item.get("link") or "").strip()
+
+
+def item_timestamp(item):
+    """pubDate as a POSIX timestamp, or None if missing or unparseable."""
+    from email.utils import parsedate_to_datetime
+    try:
+        return parsedate_to_datetime(item["pubDate"].strip()).timestamp()
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return None
+
+
+def sort_key(item):
+    """Newest first. Stored items always have a date (item_store gives an
+    undated one the time it was first seen); an item without a usable
+    pubDate, which only a feed from outside the store can hold, sorts first."""
+    ts = item_timestamp(item)
+    return float("-inf") if ts is None else -ts
+
+
+def xml_text(text):
+    """`text` as a string the way an XML parser reads it back: without the
+    characters XML 1.0 forbids, and with every line break as "\\n"."""
+    return LINE_BREAK.sub("\n", XML_INVALID.sub("", str(text)))
+
+
+def normalize_item(item):
+    """Canonical form of an item dict: known fields only, values as they
+    read back from a written feed (text stripped, see xml_text), empties
+    dropped. A normalized item and the same item parsed from the feed
+    file have the same digest."""
+    out = {}
+    for field in ITEM_FIELDS:
+        value = item.get(field)
+        if value is None:
+            continue
+        if field == "permalink":
+            if not item.get("guid"):
+                continue  # written as an attribute of <guid>
+            value = bool(value)
+        elif field == "enclosure":
+            value = {str(k): ATTR_SPACE.sub(" ", xml_text(v))
+                     for k, v in dict(value).items() if v is not None}
+            if not value.get("url"):
+                continue  # not written without one
+        else:
+            value = xml_text(value).strip()
+        if value != "":
+            out[field] = value
+    return out
+
+
+def item_digest(item):
+    """Digest of an item's content; whitespace and field order don't count."""
+    canonical = json.dumps(normalize_item(item), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FeedDigest:
+    """Order-independent digest of an item set, built one item at a time."""
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, item):
+        self.total = (self.total + int(item_digest(item), 16)) % (1 << 256)
+        self.count += 1
+
+    def hexdigest(self):
+        return f"{self.total:064x}"
+
+    def __eq__(self, other):
+        return (self.count, self.total) == (other.count, other.total)
+
+
+def element_to_item(elem):
+    """Item dict from an RSS <item> element."""
+    item = {}
+    for child in elem:
+        if child.tag == "enclosure":
+            item["enclosure"] = dict(child.attrib)
+        elif child.tag in ITEM_FIELDS:
+            item[child.tag] = (child.text or "").strip()
+            if child.tag == "guid" and "isPermaLink" in child.attrib:
+                item["permalink"] = child.attrib["isPermaLink"] == "true"
+    return item
+
+
+def iter_items(path):
+    """Stream the items of an existing feed file as dicts.
+
+    Each <item> element is dropped from the tree once converted, so memory
+    stays flat however long the feed is. `path` may also be an open binary
+    file. A missing file yields nothing; an unreadable one stops with a
+    warning.
+    """
+    if isinstance(path, str) and not os.path.exists(path):
+        return
+    import xml.etree.ElementTree as ET
+    channel = None
+    try:
+        for event, elem in ET.iterparse(path, events=("start", "end")):
+            if event == "start" and elem.tag == "channel":
+                channel = elem
+            elif event == "end" and elem.tag == "item":
+                yield element_to_item(elem)
+                if channel is not None:
+                    channel.remove(elem)
+    except ET.ParseError as e:
+        print(f"Warning: previous feed {path} unreadable, not merged: {e}")
+
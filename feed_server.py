@@ -0,0 +1,239 @@
+import hashlib
+import os
+import sys
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import feed_merge
+import feed_writer
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+HOST = "127.0.0.1"
+PORT = 8080
+CACHE_CONTROL = "public, max-age=60"
+FEED_DIRS = ("", "symbols", "searches")   # directories under BASE_DIR whose feeds (and their JSON Feed copies) are served
+CONTENT_TYPES = {".xml": "application/rss+xml; charset=utf-8", ".json": "application/feed+json"}
+
+
+def accepted_codings(header):
+    """Content codings a client accepts, from its Accept-Encoding header."""
+    accepted = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class Feed:
+    """One feed held in memory: its bytes, precompressed variants and validators.
+
+    The ETag is the feed's item-set digest (see feed_merge.FeedDigest): the
+    writers only rewrite a feed when its items change, so the same item set
+    means the same bytes. Each content coding gets its own strong tag.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.stat(path).st_mtime_ns
+        with open(path, "rb") as f:
+            identity = f.read()
+        self.bodies = {"identity": identity}
+        # Variants written by feed_writer when they are current, else compressed once here
+        if feed_writer.variants_current(path):
+            for coding, suffix in feed_writer.VARIANT_SUFFIXES.items():
+                if os.path.exists(path + suffix):
+                    with open(path + suffix, "rb") as f:
+                        self.bodies[coding] = f.read()
+        else:
+            self.bodies.update(feed_writer.compress(identity))
+        self.last_modified = formatdate(self.mtime / 1e9, usegmt=True)
+
+        if path.endswith(".xml"):
+            digest = feed_merge.FeedDigest()
+            for item in feed_merge.iter_items(path):
+                digest.add(item)
+            self.tag = digest.hexdigest()[:32]
+        else:
+            self.tag = hashlib.sha256(identity).hexdigest()[:32]
+
+    def etag(self, coding):
+        return f'"{self.tag}"' if coding == "identity" else f'"{self.tag}-{coding}"'
+
+    def matches(self, if_none_match):
+        """If-None-Match check; a tag of any coding of this version matches."""
+        if if_none_match.strip() == "*":
+            return True
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"').split("-")[0] == self.tag:
+                return True
+        return False
+
+    def choose(self, accept_encoding):
+        """Smallest representation the client accepts."""
+        accepted = accepted_codings(accept_encoding)
+        for coding in feed_writer.VARIANT_SUFFIXES:  # br before gzip
+            if coding in accepted and coding in self.bodies:
+                return coding
+        return "identity"
+
+
+class FeedStore:
+    """Feeds under `base_dir` by URL path, reloaded when their file changes."""
+
+    def __init__(self, base_dir=BASE_DIR, feed_dirs=FEED_DIRS):
+        self.base_dir = base_dir
+        self.feed_dirs = feed_dirs
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, url_path):
+        """File for a URL path, or None if it is not a served feed."""
+        rel = unquote(url_path).lstrip("/")
+        directory, _, name = rel.rpartition("/")
+        if directory not in self.feed_dirs or not name or name.startswith("."):
+            return None
+        path = os.path.join(self.base_dir, directory, name)
+        if name.endswith(".json") and not (directory and name == "index.json"):
+            # Only JSON Feed copies of a served feed, not any other JSON file
+            path_xml = os.path.splitext(path)[0] + ".xml"
+            if not os.path.isfile(path_xml):
+                return None
+        elif not name.endswith(".xml"):
+            return None
+        return path if os.path.isfile(path) else None
+
+    def get(self, url_path):
+        path = self.resolve(url_path)
+        if path is None:
+            return None
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        feed = self._feeds.get(path)
+        if feed is None or feed.mtime != mtime:
+            with self._lock:
+                feed = self._feeds.get(path)
+                if feed is None or feed.mtime != mtime:
+                    feed = self._feeds[path] = Feed(path)
+        return feed
+
+    def listing(self):
+        paths = []
+        for directory in self.feed_dirs:
+            full = os.path.join(self.base_dir, directory)
+            if os.path.isdir(full):
+                names = os.listdir(full)
+                paths += sorted("/" + os.path.join(directory, n) for n in names
+                                if n.endswith(".xml") or n.endswith(".json") and n[:-5] + ".xml" in names)
+        return paths
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FeedServer"
+    # Headers and body go out in separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def _serve(self, head):
+        url_path = urlsplit(self.path).path
+        if url_path == "/":
+            return self._send_plain(200, "\n".join(self.server.store.listing()) + "\n", head)
+        feed = self.server.store.get(url_path)
+        if feed is None:
+            return self._send_plain(404, "not found\n", head)
+
+        coding = feed.choose(self.headers.get("Accept-Encoding"))
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            not_modified = feed.matches(if_none_match)
+        else:
+            not_modified = self._not_modified_since(feed)
+
+        self.send_response(304 if not_modified else 200)
+        self.send_header("ETag", feed.etag(coding))
+        self.send_header("Last-Modified", feed.last_modified)
+        self.send_header("Cache-Control", CACHE_CONTROL)
+        self.send_header("Vary", "Accept-Encoding")
+        if not_modified:
+            self.end_headers()
+            return
+        body = feed.bodies[coding]
+        self.send_header("Content-Type", CONTENT_TYPES[os.path.splitext(feed.path)[1]])
+        if coding != "identity":
+            self.send_header("Content-Encoding", coding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _not_modified_since(self, feed):
+        since = self.headers.get("If-Modified-Since")
+        if not since:
+            return False
+        try:
+            return int(feed.mtime / 1e9) <= parsedate_to_datetime(since).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+    def _send_plain(self, status, text, head):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_server(host=HOST, port=PORT, base_dir=BASE_DIR):
+    server = ThreadingHTTPServer((host, port), FeedHandler)
+    server.daemon_threads = True
+    server.store = FeedStore(base_dir)
+    return server
+
+
+def serve_in_background(host=HOST, port=PORT, base_dir=BASE_DIR):
+    """Start the server on a daemon thread and return it."""
+    server = make_server(host, port, base_dir)
+    threading.Thread(target=server.serve_forever, name="feed-server", daemon=True).start()
+    return server
+
+
+def main():
+    args = sys.argv[1:]
+    port = int(args[args.index("--port") + 1]) if "--port" in args else PORT
+    host = args[args.index("--host") + 1] if "--host" in args else HOST
+    server = make_server(host, port)
+    print(f"Serving {len(server.store.listing())} feeds on http://{host}:{server.server_port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Feed server stopped.")
+
+
+if __name__ == "__main__":
+    main()
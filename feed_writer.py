@@ -0,0 +1,379 @@
+import gzip
+import json
+import os
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from html import escape as _html_escape
+
+import feed_merge
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+JSON_FEED_VERSION = "https://jsonfeed.org/version/1.1"
+
+# Precompressed copies written next to every feed for feed_server, by content coding
+VARIANT_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def escape(text):
+    """Escape &, < and > in element text."""
+    return _html_escape(text, quote=False)
+
+
+def quoteattr(value):
+    """Escape and double-quote an attribute value."""
+    return f'"{_html_escape(value, quote=True)}"'
+
+
+def cdata(text):
+    """Wrap text in CDATA, splitting any "]]>" it contains."""
+    return "<![CDATA[" + text.replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+
+def rfc822_now():
+    return datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S +0000")
+
+
+def published(channel, path):
+    """`channel` with `link` and `self_link` filled in for a feed this repo
+    builds from its other feeds, written to `path` (relative to the repo).
+
+    The feeds are published under the FEED_BASE_URL environment variable if
+    it is set. Under GitHub Actions they are the repository's raw files,
+    and the repository page is the link. Otherwise feed_server serves them
+    on this machine.
+    """
+    base = os.environ.get("FEED_BASE_URL")
+    repo = os.environ.get("GITHUB_REPOSITORY")
+    if base:
+        home = base = base.rstrip("/") + "/"
+    elif repo:
+        home = f"{os.environ.get('GITHUB_SERVER_URL') or 'https://github.com'}/{repo}"
+        base = f"https://raw.githubusercontent.com/{repo}/{os.environ.get('GITHUB_REF_NAME') or 'main'}/"
+    else:
+        import feed_server
+        home = base = f"http://{feed_server.HOST}:{feed_server.PORT}/"
+    return {"link": home, "self_link": base + path.replace(os.sep, "/"), **channel}
+
+
+def _element(f, indent, tag, text):
+    if text:
+        f.write(f"{indent}<{tag}>{escape(text)}</{tag}>\n")
+
+
+def write_item(f, item):
+    """Write one item dict as an RSS <item> element."""
+    f.write("    <item>\n")
+    _element(f, "      ", "title", item.get("title"))
+    _element(f, "      ", "link", item.get("link"))
+    if item.get("guid"):
+        attr = ""
+        if item.get("permalink") is not None:
+            attr = f' isPermaLink="{"true" if item["permalink"] else "false"}"'
+        f.write(f"      <guid{attr}>{escape(item['guid'])}</guid>\n")
+    _element(f, "      ", "pubDate", item.get("pubDate"))
+    _element(f, "      ", "category", item.get("category"))
+    if item.get("description"):
+        f.write(f"      <description>{cdata(item['description'])}</description>\n")
+    enclosure = item.get("enclosure")
+    if enclosure and enclosure.get("url"):
+        attrs = "".join(f" {k}={quoteattr(str(v))}" for k, v in enclosure.items())
+        f.write(f"      <enclosure{attrs} />\n")
+    f.write("    </item>\n")
+
+
+def _rss_head(f, channel):
+    atom = f' xmlns:atom="{ATOM_NS}"' if channel.get("self_link") else ""
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    f.write(f'<rss{atom} version="2.0">\n  <channel>\n')
+    _element(f, "    ", "title", channel.get("title"))
+    _element(f, "    ", "link", channel.get("link"))
+    _element(f, "    ", "description", channel.get("description"))
+    _element(f, "    ", "language", channel.get("language"))
+    _element(f, "    ", "lastBuildDate", rfc822_now())
+    if channel.get("self_link"):
+        f.write(f'    <atom:link href={quoteattr(channel["self_link"])} rel="self" type="application/rss+xml" />\n')
+
+
+def _rss_tail(f):
+    f.write("  </channel>\n</rss>\n")
+
+
+def write_rss(f, channel, items):
+    """Stream an RSS 2.0 document to the open text file `f`.
+
+    `channel` holds title, link, description and optionally language and
+    self_link (written as atom:link); lastBuildDate is set to now. `items`
+    can be any iterable of item dicts and is consumed one item at a time;
+    each is written in its normalized form (feed_merge.normalize_item).
+    Returns the number of items written.
+    """
+    _rss_head(f, channel)
+    count = 0
+    for item in items:
+        write_item(f, feed_merge.normalize_item(item))
+        count += 1
+    _rss_tail(f)
+    return count
+
+
+def json_item(item):
+    """An item dict as a JSON Feed 1.1 item."""
+    out = {"id": feed_merge.item_key(item)}
+    if item.get("link"):
+        out["url"] = item["link"]
+    if item.get("title"):
+        out["title"] = item["title"]
+    if item.get("description"):
+        out["content_html"] = item["description"]
+    else:
+        out["content_text"] = item.get("title") or ""
+    ts = feed_merge.item_timestamp(item)
+    if ts is not None:
+        out["date_published"] = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+    if item.get("category"):
+        out["tags"] = [item["category"]]
+    enclosure = item.get("enclosure")
+    if enclosure and enclosure.get("url"):
+        attachment = {"url": enclosure["url"], "mime_type": enclosure.get("type") or "application/octet-stream"}
+        if str(enclosure.get("length") or "").isdigit():
+            attachment["size_in_bytes"] = int(enclosure["length"])
+        out["attachments"] = [attachment]
+    return out
+
+
+def _json_head(f, channel):
+    head = {"version": JSON_FEED_VERSION, "title": channel.get("title") or ""}
+    if channel.get("link"):
+        head["home_page_url"] = channel["link"]
+    if channel.get("description"):
+        head["description"] = channel["description"]
+    if channel.get("language"):
+        head["language"] = channel["language"]
+    # The head object is written without its closing brace; items follow
+    f.write(json.dumps(head, ensure_ascii=False)[:-1] + ', "items": [')
+
+
+def _json_tail(f, count):
+    f.write("\n]}\n" if count else "]}\n")
+
+
+def output_paths(path):
+    """(JSON Feed, NDJSON) files written alongside the RSS feed at `path`."""
+    base = os.path.splitext(path)[0]
+    return base + ".json", base + ".ndjson"
+
+
+def _render(path, channel, items, old_keys):
+    """Render `items` once into all formats: RSS and JSON Feed to temporary
+    files, and NDJSON lines for items whose key is not in `old_keys`.
+    Returns (count, [(tmp, path)] to put in place, tmp file of new NDJSON lines)."""
+    json_path, ndjson_path = output_paths(path)
+    name = os.path.basename(path)
+    outputs = [(path + ".tmp", path), (json_path + ".tmp", json_path)]
+    with open(outputs[0][0], "w", encoding="utf-8") as rss, \
+            open(outputs[1][0], "w", encoding="utf-8") as jf, \
+            open(ndjson_path + ".tmp", "w", encoding="utf-8") as nd:
+        _rss_head(rss, channel)
+        _json_head(jf, channel)
+        count = 0
+        for item in items:
+            # Drops characters XML can't hold, for the RSS and JSON copies alike
+            item = feed_merge.normalize_item(item)
+            write_item(rss, item)
+            entry = json.dumps(json_item(item), ensure_ascii=False)
+            jf.write(("," if count else "") + "\n  " + entry)
+            if feed_merge.item_key(item) not in old_keys:
+                nd.write(entry[:-1] + f', "feed": {json.dumps(name)}}}\n')
+            count += 1
+        _rss_tail(rss)
+        _json_tail(jf, count)
+    return count, outputs, ndjson_path + ".tmp"
+
+
+def write_feed(path, channel, items, keep_first_seen=False,
+               max_items=feed_merge.MAX_ITEMS, max_age_days=feed_merge.MAX_AGE_DAYS, metrics=None):
+    """Store `items` as the latest batch of the feed at `path`, then write
+    the feed out from the item store.
+
+    Items are upserted into item_store under the feed's file name and added
+    to its full-text index; a source the store has not seen yet is first
+    seeded from the feed already on disk. The feed is the newest `max_items` stored items within
+    `max_age_days` (items of this batch always count), with
+    `keep_first_seen` as for item_store.upsert().
+
+    The query result is rendered in one pass into the RSS feed, a JSON Feed
+    1.1 copy (see output_paths) and an append-only NDJSON log of items not
+    in the previous feed. Temporary files then replace the outputs
+    atomically. If the item set is identical to the one already on disk,
+    they are discarded and the outputs are left untouched. Returns the
+    number of items in the feed.
+
+    With a run_metrics `metrics` recorder, time spent producing items and
+    reading them back is recorded as render, the rest (the store, the
+    files, the digest check) as write.
+    """
+    old_digest = feed_merge.FeedDigest()
+    new_digest = feed_merge.FeedDigest()
+    old_keys = set()
+    for old in feed_merge.iter_items(path):
+        old_digest.add(old)
+        old_keys.add(feed_merge.item_key(old))
+
+    def counted(stream):
+        for item in stream:
+            new_digest.add(item)
+            yield item
+
+    # sqlite3 and the store are only loaded by generators that write a
+    # source feed, not by every importer of this module
+    import item_store
+    source = os.path.basename(path)
+    with _stage(metrics, "write"):
+        db = item_store.connect()
+        try:
+            if old_digest.count and not item_store.has_source(db, source):
+                item_store.import_items(db, source, feed_merge.iter_items(path), os.stat(path).st_mtime)
+            seen = item_store.upsert(db, source, _timed(metrics, items), keep_first_seen)
+            item_store.index_text(db)
+            db.commit()
+            stored = item_store.feed_items(db, source, seen, max_items, max_age_days)
+            count, outputs, new_lines = _render(path, channel, counted(_timed(metrics, stored)), old_keys)
+        finally:
+            db.close()
+        _replace_if_changed(outputs, new_lines, old_digest, new_digest)
+    if metrics is not None:
+        metrics.count("items", count)
+    return count
+
+
+def write_items(path, channel, items, metrics=None):
+    """Write `items` as the feed at `path`, as given (no merge with the
+    previous file), in every format write_feed() writes.
+
+    For feeds that are views over other feeds. The previous file is
+    streamed once up front for its keys and digest; the outputs are left
+    untouched if the item set is the same. Returns the number of items
+    written. `metrics` as for write_feed().
+    """
+    old_digest = feed_merge.FeedDigest()
+    new_digest = feed_merge.FeedDigest()
+    old_keys = set()
+    for old in feed_merge.iter_items(path):
+        old_digest.add(old)
+        old_keys.add(feed_merge.item_key(old))
+
+    def counted(stream):
+        for item in stream:
+            new_digest.add(item)
+            yield item
+
+    with _stage(metrics, "write"):
+        count, outputs, new_lines = _render(path, channel, counted(_timed(metrics, items)), old_keys)
+        _replace_if_changed(outputs, new_lines, old_digest, new_digest)
+    if metrics is not None:
+        metrics.count("items", count)
+    return count
+
+
+def _stage(metrics, name):
+    return metrics.stage(name) if metrics is not None else nullcontext()
+
+
+def _timed(metrics, items):
+    return metrics.timed(items, "render") if metrics is not None else items
+
+
+def compress(data):
+    """{content coding: compressed bytes} of `data`. Brotli is only
+    included when the optional `brotli` package is installed."""
+    variants = {"gzip": gzip.compress(data, GZIP_LEVEL, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        variants["br"] = brotli.compress(data, quality=BROTLI_QUALITY)
+    return variants
+
+
+def variants_current(path):
+    """True if every variant of `path` that exists is at least as new as it."""
+    mtime = os.path.getmtime(path)
+    existing = [path + suffix for suffix in VARIANT_SUFFIXES.values() if os.path.exists(path + suffix)]
+    return bool(existing) and all(os.path.getmtime(v) >= mtime for v in existing)
+
+
+def write_variants(path):
+    """Write the compressed variants of the feed at `path` next to it
+    (path.gz, path.br), so they are compressed once per change rather than
+    once per request."""
+    with open(path, "rb") as f:
+        data = f.read()
+    for coding, body in compress(data).items():
+        variant = path + VARIANT_SUFFIXES[coding]
+        with open(variant + ".tmp", "wb") as f:
+            f.write(body)
+        os.replace(variant + ".tmp", variant)
+
+
+def _replace_if_changed(outputs, new_lines, old_digest, new_digest):
+    """Put the rendered (tmp, path) outputs in place and append the new
+    NDJSON lines to the log, unless the item set is unchanged."""
+    unchanged = old_digest.count and old_digest == new_digest
+    for tmp, out in outputs:
+        # A format missing on disk (e.g. a feed written before it existed) is still put in place
+        if unchanged and os.path.exists(out):
+            os.remove(tmp)
+            if not variants_current(out):
+                write_variants(out)
+        else:
+            os.replace(tmp, out)
+            write_variants(out)
+    if unchanged:
+        os.remove(new_lines)
+        print(f"No item changes; {outputs[0][1]} left as is.")
+        return
+    with open(new_lines, encoding="utf-8") as src:
+        lines = src.read()
+    os.remove(new_lines)
+    if lines:
+        # One append per run, so a reader tailing the log only sees whole runs
+        with open(new_lines[:-len(".tmp")], "a", encoding="utf-8") as log:
+            log.write(lines)
+
+
+def self_check():
+    """Write items holding characters XML 1.0 forbids, parse the feed back
+    and check that it digests like the items it was written from."""
+    import tempfile
+    import xml.etree.ElementTree as ET
+    items = [
+        {"title": "Q2 results\x01", "link": "https://example.com/a?x=1&y=2", "pubDate": rfc822_now()},
+        {"title": "Board meeting", "link": "https://example.com/b", "pubDate": rfc822_now(),
+         "description": "<p>Record\x0b date\ud800</p>\r\n<p>Dividend</p>", "category": "\x1fCorporate action",
+         "enclosure": {"url": "https://example.com/b.jpg", "type": "image/jpeg", "length": 2048}},
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "check.xml")
+        write_items(path, {"title": "check", "link": "https://example.com/"}, items)
+        ET.parse(path)
+        with open(output_paths(path)[0], encoding="utf-8") as f:
+            json.load(f)
+        written, read_back = feed_merge.FeedDigest(), feed_merge.FeedDigest()
+        for item in items:
+            written.add(item)
+        got = []
+        for item in feed_merge.iter_items(path):
+            read_back.add(item)
+            got.append((item["title"], item.get("category")))
+    if got != [("Q2 results", None), ("Board meeting", "Corporate action")]:
+        raise SystemExit(f"feed_writer self-check failed: read back {got}")
+    if written != read_back:
+        raise SystemExit("feed_writer self-check failed: the written feed digests differently from its items")
+    print("feed_writer self-check: ok")
+
+if __name__ == "__main__":
+    # python feed_writer.py: check that written feeds parse, and read back as written
+    self_check()
@@ -0,0 +1,135 @@
+import re
+
+# lxml is imported on first use so feeds that never parse HTML don't pay for it
+_html = None
+_parser = None
+
+WHITESPACE = re.compile(r"\s+")
+CHARSET = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+
+CHUNK_SIZE = 16 * 1024  # bytes read from the socket per parser feed
+
+
+def _lxml_html():
+    global _html, _parser
+    if _html is None:
+        import lxml.html
+        _parser = lxml.html.HTMLParser(encoding="utf-8")
+        _html = lxml.html
+    return _html
+
+
+def parse(html):
+    """Parse an HTML document (str or bytes) once into an lxml tree.
+
+    Already-parsed trees are returned as is, so helpers can take either.
+    """
+    lxml_html = _lxml_html()
+    if not isinstance(html, (str, bytes)):
+        return html
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    if not html.strip():
+        return lxml_html.fromstring(b"<html></html>", parser=_parser)
+    return lxml_html.fromstring(html, parser=_parser)
+
+
+class XPath:
+    """XPath expression compiled once, on first use, and reused for every document."""
+
+    def __init__(self, expr):
+        self.expr = expr
+        self._compiled = None
+
+    def __call__(self, node, **variables):
+        if self._compiled is None:
+            _lxml_html()
+            from lxml import etree
+            self._compiled = etree.XPath(self.expr)
+        return self._compiled(node, **variables)
+
+    def first(self, node, **variables):
+        found = self(node, **variables)
+        return found[0] if found else None
+
+
+def has_class(name):
+    """XPath predicate matching elements whose class list contains `name`."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def normalize(text):
+    """Collapse runs of whitespace into single spaces and trim."""
+    return WHITESPACE.sub(" ", text or "").strip()
+
+
+def text(node):
+    """All text under `node`, whitespace-normalized, in one linear pass.
+
+    Text pieces are joined with spaces so <br/> and block boundaries don't
+    glue words together. Returns "" for None.
+    """
+    if node is None:
+        return ""
+    return normalize(" ".join(node.itertext()))
+
+
+def stream_element(resp, element_id, max_bytes=None, chunk_size=CHUNK_SIZE):
+    """Read a streamed response only as far as the element with id `element_id`.
+
+    `resp` must come from a request made with stream=True. Chunks are fed
+    to an incremental parser as they arrive, and the connection is closed
+    as soon as the element's end tag has been parsed, so the rest of the page
+    is never downloaded. At most `max_bytes` are read. If the cap is hit
+    while the element is still open, the element is returned with whatever
+    it holds so far.
+
+    Returns (element or None, bytes read).
+    """
+    _lxml_html()
+    from lxml import etree
+
+    m = CHARSET.search(resp.headers.get("Content-Type", ""))
+    parser = etree.HTMLPullParser(events=("start", "end"), encoding=m.group(1) if m else None)
+    target = None
+    read = 0
+    try:
+        for chunk in resp.iter_content(chunk_size):
+            read += len(chunk)
+            parser.feed(chunk)
+            for event, el in parser.read_events():
+                if event == "start" and target is None and el.get("id") == element_id:
+                    target = el
+                elif event == "end" and el is target:
+                    return target, read
+            if max_bytes and read >= max_bytes:
+                return target, read
+        # Whole page read: closing flushes elements the page left unclosed
+        parser.close()
+        for event, el in parser.read_events():
+            if event == "start" and target is None and el.get("id") == element_id:
+                target = el
+        return target, read
+    finally:
+        resp.close()
+
+
+def drop(node):
+    """Remove `node` and everything under it from its tree, keeping the text after it."""
+    parent = node.getparent()
+    if parent is None:
+        return
+    if node.tail:
+        prev = node.getprevious()
+        if prev is not None:
+            prev.tail = (prev.tail or "") + node.tail
+        else:
+            parent.text = (parent.text or "") + node.tail
+    parent.remove(node)
+
+
+def to_html(node):
+    """Serialize an element (and its content) back to HTML bytes."""
+    _lxml_html()
+    from lxml import etree
+    return etree.tostring(node, encoding="utf-8", method="html", with_tail=False)
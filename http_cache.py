@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import time
+
+import html_extract
+import http_client
+import run_metrics
+
+# ================== CONFIG ==================
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "http")
+
+
+def _paths(url):
+    key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, key + ".json"), os.path.join(CACHE_DIR, key + ".body")
+
+
+def _load(url):
+    meta_path, body_path = _paths(url)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            return meta, f.read()
+    except (OSError, ValueError):
+        return None, None
+
+
+def _entry(url, resp, body):
+    meta = {
+        "url": url,
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "sha256": hashlib.sha256(body).hexdigest(),
+    }
+    return meta, body
+
+
+def commit(entry):
+    """Save the validators and payload of a fetch (see get() and
+    get_element()) for the next run's conditional GET.
+
+    Call only once the feed built from the payload has been written, and
+    nothing in it needs redoing: until then the next run refetches and
+    rebuilds in full. `entry` may be None (nothing to save).
+    """
+    if entry is None:
+        return
+    meta, body = entry
+    meta_path, body_path = _paths(meta["url"])
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(body_path + ".tmp", "wb") as f:
+        f.write(body)
+    os.replace(body_path + ".tmp", body_path)
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+
+
+def _validators(url, output, headers):
+    meta, cached_body = _load(url)
+    if output is not None and not os.path.exists(output):
+        meta = None
+
+    headers = dict(headers or {})
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    return meta, cached_body, headers
+
+
+def get(url, session=None, output=None, headers=None, **kwargs):
+    """Conditional GET backed by an on-disk cache of validators and payloads.
+
+    Sends If-None-Match / If-Modified-Since from the last committed
+    response. The returned response has a `not_modified` flag that is True
+    when the server answered 304 or sent back a byte-identical payload; the
+    body is then the cached payload, and callers can skip parsing and
+    rendering. Validators are only sent when `output` (the feed built from
+    this payload) exists, so a missing feed is always rebuilt.
+
+    A new payload is not saved here: the response's `cache_entry` goes to
+    commit() once the feed has been written from it.
+    """
+    session = session or http_client.default_session()
+    meta, cached_body, headers = _validators(url, output, headers)
+
+    resp = session.get(url, headers=headers, **kwargs)
+    resp.not_modified = False
+    resp.cache_entry = None
+
+    if resp.status_code == 304 and meta:
+        resp.not_modified = True
+        resp._content = cached_body
+    elif resp.status_code == 200:
+        if meta and hashlib.sha256(resp.content).hexdigest() == meta.get("sha256"):
+            resp.not_modified = True
+        resp.cache_entry = _entry(url, resp, resp.content)
+    if resp.not_modified:
+        run_metrics.recorder(session.name).count("http_cache_hits")
+    return resp
+
+
+def get_element(url, element_id, session=None, output=None, max_bytes=None, headers=None, volatile=None,
+                **kwargs):
+    """Conditional GET that keeps only one element of an HTML page.
+
+    Like get(), but the body is streamed through
+    html_extract.stream_element: the connection is dropped as soon as the
+    element with id `element_id` is complete, and at most `max_bytes` are
+    read. The cached payload, and the byte-identical check, cover that
+    element's markup only. Nodes matched by `volatile` (an
+    html_extract.XPath), such as relative "5 minutes ago" times, are
+    removed from the element first. Raises for HTTP errors.
+
+    Returns (markup, not_modified, entry). markup is the element's HTML as
+    bytes, or None if the page has no such element; entry goes to commit()
+    once the feed has been written from it.
+    """
+    session = session or http_client.default_session()
+    meta, cached_body, headers = _validators(url, output, headers)
+
+    metrics = run_metrics.recorder(session.name)
+    resp = session.get(url, headers=headers, stream=True, **kwargs)
+    if resp.status_code == 304 and meta:
+        resp.close()
+        metrics.count("http_cache_hits")
+        return cached_body, True, None
+    if resp.status_code >= 400:
+        resp.close()
+        resp.raise_for_status()
+
+    # The page is parsed as it arrives, so this is download and parse together
+    start = time.perf_counter()
+    element, read = html_extract.stream_element(resp, element_id, max_bytes=max_bytes)
+    metrics.add("download", time.perf_counter() - start)
+    metrics.count("bytes", read)
+    if element is None:
+        print(f"Warning: no #{element_id} in the first {read} bytes of {url}")
+        return None, False, None
+    if volatile is not None:
+        for node in volatile(element):
+            html_extract.drop(node)
+    markup = html_extract.to_html(element)
+    not_modified = bool(meta) and hashlib.sha256(markup).hexdigest() == meta.get("sha256")
+    if not_modified:
+        metrics.count("http_cache_hits")
+    return markup, not_modified, _entry(url, resp, markup)
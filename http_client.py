@@ -0,0 +1,72 @@
+import threading
+import weakref
+
+_sessions = weakref.WeakSet()
+_default = None
+
+
+class Session:
+    """Shared HTTP session for the scrapers (see http_pool.PooledSession).
+
+    Creating one is cheap: `requests` is only imported, and the pooled
+    session built, on the first request. Modules can therefore create their
+    session at import time without paying for `requests` on runs that never
+    touch the network. Any attribute not defined here is forwarded to the
+    underlying session.
+    """
+
+    def __init__(self, headers=None, name="default", **options):
+        self.name = name
+        self._headers = headers
+        self._options = options
+        self._session = None
+        self._lock = threading.Lock()
+        _sessions.add(self)
+
+    def _real(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    from http_pool import PooledSession
+                    self._session = PooledSession(self._headers, name=self.name, **self._options)
+        return self._session
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self._real(), attr)
+
+    def request(self, method, url, **kwargs):
+        return self._real().request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self._real().get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self._real().post(url, **kwargs)
+
+    def stats(self):
+        if self._session is None:
+            return {"name": self.name, "requests": 0, "connections": 0, "reused": 0, "retries": 0}
+        return self._session.stats()
+
+
+def default_session():
+    """Shared session for callers that don't bring their own."""
+    global _default
+    if _default is None:
+        _default = Session(name="default")
+    return _default
+
+
+def all_stats():
+    return sorted((s.stats() for s in list(_sessions)), key=lambda st: st["name"])
+
+
+def report():
+    """Print connection-reuse stats for every live session that made requests."""
+    for st in all_stats():
+        if st["requests"]:
+            print(f"HTTP {st['name']}: {st['requests']} requests over "
+                  f"{st['connections']} connections ({st['reused']} reused, "
+                  f"{st['retries']} retries)")
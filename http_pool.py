@@ -0,0 +1,223 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import run_metrics
+
+# ================== CONFIG ==================
+DEFAULT_TIMEOUT = 20        # seconds, used when a call doesn't pass one
+MAX_RETRIES = 3             # retries after the first attempt
+RETRY_DEADLINE = 40         # seconds; a retry is only started if it can end by then
+BACKOFF_BASE = 0.5          # seconds; doubled on every retry
+BACKOFF_MAX = 8.0           # cap for a single backoff sleep
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BLOCKED_STATUSES = {403, 429}  # the site is refusing us; counted for the poll scheduler
+POOL_CONNECTIONS = 16       # hosts with a pool kept per session
+POOL_MAXSIZE = 8            # keep-alive connections kept per host
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given retry number."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def retry_after(resp):
+    """Seconds from a Retry-After header, capped at BACKOFF_MAX; None if absent."""
+    try:
+        return min(BACKOFF_MAX, max(0.0, float(resp.headers["Retry-After"])))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class DeadlineExceeded(requests.Timeout):
+    """A request was started after its session's deadline (see set_deadline)."""
+
+
+# Monotonic time after which sessions of a name stop sending requests
+_deadlines = {}
+
+
+def set_deadline(name, when):
+    """Stop the sessions named `name` at monotonic time `when`, or never
+    again with None.
+
+    Set by feed_engine and feed_daemon for the length of a source's run:
+    requests are cut to the time left and any request after `when` raises
+    DeadlineExceeded, so a source that overruns fails its remaining
+    fetches quickly, writes what it has and returns. Applies to every
+    thread using the session.
+    """
+    if when is None:
+        _deadlines.pop(name, None)
+    else:
+        _deadlines[name] = when
+
+
+def _capped(timeout, deadline):
+    """`timeout` (seconds or a (connect, read) pair) cut to the time left until `deadline`."""
+    left = deadline - time.monotonic()
+    if isinstance(timeout, tuple):
+        return tuple(left if t is None else min(t, left) for t in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+# Seconds spent opening connections by the current thread's request
+_connect_time = threading.local()
+
+
+class _TimedConnect:
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.seconds = getattr(_connect_time, "seconds", 0.0) + time.perf_counter() - start
+
+
+class TimedHTTPConnection(_TimedConnect, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnect, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections report how long connecting (TCP and
+    TLS handshake) took, so it can be told apart from time to first byte."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+class PooledSession(requests.Session):
+    """requests.Session with per-host keep-alive pools, a default timeout and
+    retries with jittered exponential backoff on 429/5xx and connection errors.
+
+    A read timeout is not retried: the server took the request and did not
+    answer, and would most likely keep the next attempt waiting as long.
+    Nor is any retry started that, with its backoff and full timeout, could
+    end later than `retry_deadline` seconds after the call began, so a call
+    never runs much past max(timeout, retry_deadline) and fits the
+    generator's time limit in run_all. No request is sent past the deadline
+    set for the session's name (see set_deadline).
+
+    Counts requests and retries so connection reuse can be reported, and
+    adds every request's connect, time-to-first-byte and download time to
+    the run_metrics recorder of the same name. A call can pass
+    `max_retries` to override the session's, e.g. 0 where even one retry
+    would blow the caller's own time budget.
+    """
+
+    def __init__(self, headers=None, name="default", timeout=DEFAULT_TIMEOUT,
+                 max_retries=MAX_RETRIES, retry_deadline=RETRY_DEADLINE, pool_maxsize=POOL_MAXSIZE):
+        super().__init__()
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_deadline = retry_deadline
+        self.requests_sent = 0
+        self.retries = 0
+        self.metrics = run_metrics.recorder(name)
+        if headers:
+            self.headers.update(headers)
+        adapter = TimedAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=pool_maxsize)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, max_retries=None, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.timeout
+        if max_retries is None:
+            max_retries = self.max_retries
+        timeout = kwargs["timeout"]
+        attempt_seconds = sum(timeout) if isinstance(timeout, tuple) else timeout
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            deadline = _deadlines.get(self.name)
+            if deadline is not None:
+                if time.monotonic() >= deadline:
+                    raise DeadlineExceeded(f"{self.name}: run deadline passed, {method} {url} not sent")
+                kwargs["timeout"] = _capped(timeout, deadline)
+            self.requests_sent += 1
+            try:
+                resp = self._timed_request(method, url, **kwargs)
+            except requests.ReadTimeout:
+                raise
+            except (requests.ConnectionError, requests.Timeout):
+                delay = backoff_delay(attempt)
+                if attempt >= max_retries or not self._retry_fits(start, delay, attempt_seconds):
+                    raise
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt >= max_retries:
+                    return resp
+                delay = retry_after(resp)
+                if delay is None:
+                    delay = backoff_delay(attempt)
+                if not self._retry_fits(start, delay, attempt_seconds):
+                    return resp
+                resp.close()
+            attempt += 1
+            self.retries += 1
+            self.metrics.count("retries")
+            time.sleep(delay)
+
+    def _retry_fits(self, start, delay, attempt_seconds):
+        """Whether a retry after `delay` could time out and still end by the deadline."""
+        return time.monotonic() - start + delay + attempt_seconds <= self.retry_deadline
+
+    def _timed_request(self, method, url, **kwargs):
+        _connect_time.seconds = 0.0
+        start = time.perf_counter()
+        resp = super().request(method, url, **kwargs)
+        total = time.perf_counter() - start
+        connect = _connect_time.seconds
+        # elapsed runs until the headers are parsed; a streamed body is read
+        # later by the caller and is not counted here
+        headers_at = min(total, resp.elapsed.total_seconds())
+        if kwargs.get("stream"):
+            download, nbytes = 0.0, 0
+        else:
+            download, nbytes = total - headers_at, len(resp.content)
+        self.metrics.request(connect, max(0.0, headers_at - connect), download, nbytes,
+                             blocked=resp.status_code in BLOCKED_STATUSES)
+        return resp
+
+    def connections_opened(self):
+        """Connections opened so far across this session's host pools."""
+        opened = 0
+        for adapter in {id(a): a for a in self.adapters.values()}.values():
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+        return opened
+
+    def stats(self):
+        opened = self.connections_opened()
+        return {
+            "name": self.name,
+            "requests": self.requests_sent,
+            "connections": opened,
+            "reused": max(0, self.requests_sent - opened),
+            "retries": self.retries,
+        }
@@ -0,0 +1,409 @@
+import itertools
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from email.utils import formatdate
+from html import unescape
+
+import feed_merge
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_FILE = os.path.join(BASE_DIR, ".cache", "items.db")
+BUSY_TIMEOUT = 30      # seconds a writer waits for another process's write to finish
+BM25_WEIGHTS = (4.0, 1.0)  # weight of a match in the title and in the body when ranking
+SEARCH_LIMIT = 20      # results shown by the search command
+# Feeds built from other feeds (feed_master, feed_dedup); never stored, so
+# their items are not kept and indexed twice
+DERIVED_FEEDS = ("all-news.xml", "unique-news.xml")
+
+TAG = re.compile(r"<[^>]+>")
+SPACES = re.compile(r"\s+")
+
+# `source` is the feed file an item was written to; `guid` its item_key().
+# pub_ts is pubDate as a POSIX timestamp; `position` its place in the
+# batch it was last seen in, to keep the source's order among equal dates.
+# `tagged` and `indexed` are cleared whenever the item's content changes,
+# so symbol_feeds re-matches it and index_text() re-indexes it.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    guid TEXT NOT NULL,
+    pub_date TEXT,
+    pub_ts REAL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    position INTEGER NOT NULL DEFAULT 0,
+    digest TEXT NOT NULL,
+    data TEXT NOT NULL,
+    tagged INTEGER NOT NULL DEFAULT 0,
+    indexed INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS items_source_guid ON items (source, guid);
+CREATE INDEX IF NOT EXISTS items_pub_ts ON items (pub_ts);
+CREATE INDEX IF NOT EXISTS items_untagged ON items (source) WHERE NOT tagged;
+
+CREATE TABLE IF NOT EXISTS item_symbols (
+    symbol TEXT NOT NULL,
+    item_id INTEGER NOT NULL REFERENCES items (id) ON DELETE CASCADE,
+    pub_ts REAL,
+    PRIMARY KEY (symbol, item_id)
+);
+CREATE INDEX IF NOT EXISTS item_symbols_symbol ON item_symbols (symbol, pub_ts);
+CREATE INDEX IF NOT EXISTS item_symbols_item ON item_symbols (item_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Full-text index over title and body text; its rowid is the item's id
+FTS_SCHEMA = """
+CREATE INDEX IF NOT EXISTS items_unindexed ON items (id) WHERE NOT indexed;
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (title, body, tokenize = 'porter unicode61');
+"""
+
+UPSERT = """
+INSERT INTO items (source, guid, pub_date, pub_ts, first_seen, last_seen, position, digest, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (source, guid) DO UPDATE SET
+    pub_date = excluded.pub_date,
+    pub_ts = excluded.pub_ts,
+    last_seen = excluded.last_seen,
+    position = excluded.position,
+    data = excluded.data,
+    tagged = CASE WHEN items.digest = excluded.digest THEN items.tagged ELSE 0 END,
+    indexed = CASE WHEN items.digest = excluded.digest THEN items.indexed ELSE 0 END,
+    digest = excluded.digest
+"""
+
+# Imported items never overwrite what the store already holds; they only
+# widen the seen window
+IMPORT = """
+INSERT INTO items (source, guid, pub_date, pub_ts, first_seen, last_seen, position, digest, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (source, guid) DO UPDATE SET
+    first_seen = min(items.first_seen, excluded.first_seen),
+    last_seen = max(items.last_seen, excluded.last_seen)
+"""
+
+
+def connect(path=None):
+    """Open the item store (DB_FILE by default) in WAL mode, creating it if needed.
+
+    WAL lets generators in other processes and threads read while one of
+    them writes. Use one connection per thread.
+    """
+    path = path or DB_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    db = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.execute("PRAGMA foreign_keys = ON")
+    db.executescript(SCHEMA)
+    if "indexed" not in {row[1] for row in db.execute("PRAGMA table_info(items)")}:
+        # Stores created before the full-text index
+        db.execute("ALTER TABLE items ADD COLUMN indexed INTEGER NOT NULL DEFAULT 0")
+    db.executescript(FTS_SCHEMA)
+    _date_undated(db)
+    _drop_derived(db)
+    return db
+
+
+def _drop_derived(db):
+    """Delete items stored under a derived feed (stores written while
+    unique-news.xml was built with feed_writer.write_feed)."""
+    marks = ",".join("?" * len(DERIVED_FEEDS))
+    ids = [(item_id,) for (item_id,) in
+           db.execute(f"SELECT id FROM items WHERE source IN ({marks})", DERIVED_FEEDS)]
+    if ids:
+        db.executemany("DELETE FROM items_fts WHERE rowid = ?", ids)
+        db.executemany("DELETE FROM items WHERE id = ?", ids)
+        db.commit()
+
+
+def _date_undated(db):
+    """Give items stored without a pubDate the time they were first seen
+    (stores written before undated items were dated on the way in)."""
+    rows = db.execute("SELECT id, first_seen, data FROM items WHERE pub_ts IS NULL").fetchall()
+    for item_id, first_seen, data in rows:
+        item = _dated(json.loads(data), first_seen)
+        db.execute(
+            """UPDATE items SET pub_date = ?, pub_ts = ?, digest = ?, data = ?, tagged = 0, indexed = 0
+               WHERE id = ?""",
+            (item["pubDate"], feed_merge.item_timestamp(item), feed_merge.item_digest(item),
+             json.dumps(item, ensure_ascii=False), item_id),
+        )
+    if rows:
+        db.commit()
+
+
+def _dated(item, seen):
+    """`item`, given the time `seen` as its pubDate if it has no usable one,
+    so undated items age out like any other."""
+    if feed_merge.item_timestamp(item) is None:
+        item["pubDate"] = formatdate(seen, usegmt=True)
+    return item
+
+
+def _row(source, item, seen, position):
+    key = feed_merge.item_key(item) or feed_merge.item_digest(item)
+    return (source, key, item.get("pubDate"), feed_merge.item_timestamp(item), seen, seen, position,
+            feed_merge.item_digest(item), json.dumps(item, ensure_ascii=False))
+
+
+def has_source(db, source):
+    return db.execute("SELECT 1 FROM items WHERE source = ? LIMIT 1", (source,)).fetchone() is not None
+
+
+def upsert(db, source, items, keep_first_seen=False):
+    """Insert or update `items` as the latest batch of `source`.
+
+    With `keep_first_seen`, an item already stored keeps its stored pubDate
+    (for sources whose pubDate is just the build time). An item without a
+    pubDate keeps the one it was stored with, or gets the time it was first
+    seen. Returns the batch's seen time, which feed_items() uses to keep
+    the batch whatever its age.
+    """
+    seen = time.time()
+    rows = []
+    for position, item in enumerate(items):
+        item = feed_merge.normalize_item(item)
+        if keep_first_seen or feed_merge.item_timestamp(item) is None:
+            stored = db.execute(
+                "SELECT pub_date FROM items WHERE source = ? AND guid = ?", (source, feed_merge.item_key(item))
+            ).fetchone()
+            if stored and stored[0]:
+                item["pubDate"] = stored[0]
+        rows.append(_row(source, _dated(item, seen), seen, position))
+    db.executemany(UPSERT, rows)
+    return seen
+
+
+def import_items(db, source, items, seen=None):
+    """Add items read back from a feed written at `seen` (default now);
+    undated ones get `seen` as their pubDate. Returns the number of items read."""
+    seen = time.time() if seen is None else seen
+    rows = [_row(source, _dated(feed_merge.normalize_item(item), seen), seen, position)
+            for position, item in enumerate(items)]
+    db.executemany(IMPORT, rows)
+    return len(rows)
+
+
+def feed_items(db, source, batch_seen=None, max_items=feed_merge.MAX_ITEMS,
+               max_age_days=feed_merge.MAX_AGE_DAYS):
+    """Stream the newest `max_items` items of `source`, newest first, as
+    write_feed() renders them.
+
+    Items older than `max_age_days` are left out unless they were part of
+    the batch seen at `batch_seen`. Ties keep the latest batch first, in
+    the source's order.
+    """
+    cutoff = time.time() - max_age_days * 86400
+    cur = db.execute(
+        """SELECT data FROM items
+           WHERE source = ? AND (pub_ts >= ? OR last_seen = ?)
+           ORDER BY pub_ts DESC, last_seen DESC, position
+           LIMIT ?""",
+        (source, cutoff, batch_seen, -1 if max_items is None else max_items),
+    )
+    for (data,) in cur:
+        yield json.loads(data)
+
+
+# ================== FULL-TEXT SEARCH ==================
+def item_text(item):
+    """(title, body) of an item as plain text."""
+    title = SPACES.sub(" ", unescape(TAG.sub(" ", item.get("title") or ""))).strip()
+    body = SPACES.sub(" ", unescape(TAG.sub(" ", item.get("description") or ""))).strip()
+    return title, body
+
+
+def index_text(db):
+    """Add items not in the full-text index yet, or changed since, to it.
+
+    Call inside the transaction that stored them, so two writers never
+    index the same items. Returns the number of items indexed.
+    """
+    rows = db.execute("SELECT id, data FROM items WHERE NOT indexed").fetchall()
+    for item_id, data in rows:
+        db.execute("DELETE FROM items_fts WHERE rowid = ?", (item_id,))
+        db.execute("INSERT INTO items_fts (rowid, title, body) VALUES (?, ?, ?)",
+                   (item_id, *item_text(json.loads(data))))
+    db.executemany("UPDATE items SET indexed = 1 WHERE id = ?", [(item_id,) for item_id, _ in rows])
+    return len(rows)
+
+
+def search(db, query, sources=None):
+    """Stream (source, item, snippet) of items matching an FTS5 `query`,
+    best BM25 match first; an item carried by several feeds is kept once.
+
+    `query` uses FTS5 syntax: words, "quoted phrases", AND, OR, NOT,
+    NEAR(...) and prefix* searches. Matching is case-insensitive and on
+    word stems, so "deal" also finds "deals". With `sources`, only items
+    of those feeds. Raises sqlite3.OperationalError for a malformed query.
+    """
+    sql = """SELECT i.source, i.data, snippet(items_fts, -1, '[', ']', '…', 16)
+              FROM items_fts JOIN items i ON i.id = items_fts.rowid
+              WHERE items_fts MATCH ?"""
+    params = [query]
+    if sources is not None:
+        sql += f" AND i.source IN ({','.join('?' * len(sources))})"
+        params += list(sources)
+    sql += f" ORDER BY bm25(items_fts, {', '.join(map(str, BM25_WEIGHTS))})"
+    seen = set()
+    for source, data, snippet in db.execute(sql, params):
+        item = json.loads(data)
+        key = feed_merge.item_key(item)
+        if key in seen:
+            continue
+        seen.add(key)
+        yield source, item, snippet
+
+
+# ================== SYMBOLS ==================
+def get_meta(db, key):
+    row = db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(db, key, value):
+    db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+
+def reset_symbols(db):
+    """Forget every symbol match, so all items are matched again."""
+    db.execute("DELETE FROM item_symbols")
+    db.execute("UPDATE items SET tagged = 0 WHERE tagged")
+
+
+def untagged(db, sources):
+    """(id, source, item) of items of `sources` not yet matched against the watchlist."""
+    marks = ",".join("?" * len(sources))
+    rows = db.execute(f"SELECT id, source, data FROM items WHERE NOT tagged AND source IN ({marks})",
+                      list(sources)).fetchall()
+    return [(item_id, source, json.loads(data)) for item_id, source, data in rows]
+
+
+def set_symbols(db, item_id, symbols, pub_ts):
+    """Record the symbols an item mentions, replacing earlier matches."""
+    db.execute("DELETE FROM item_symbols WHERE item_id = ?", (item_id,))
+    db.executemany("INSERT INTO item_symbols (symbol, item_id, pub_ts) VALUES (?, ?, ?)",
+                   [(symbol, item_id, pub_ts) for symbol in symbols])
+    db.execute("UPDATE items SET tagged = 1 WHERE id = ?", (item_id,))
+
+
+def symbols(db):
+    return [symbol for (symbol,) in db.execute("SELECT DISTINCT symbol FROM item_symbols ORDER BY symbol")]
+
+
+def symbol_items(db, symbol):
+    """Stream (source, item) of every item mentioning `symbol`, newest first."""
+    cur = db.execute(
+        """SELECT i.source, i.data FROM item_symbols s JOIN items i ON i.id = s.item_id
+           WHERE s.symbol = ? ORDER BY s.pub_ts DESC""",
+        (symbol,),
+    )
+    for source, data in cur:
+        yield source, json.loads(data)
+
+
+# ================== BACKFILL ==================
+def feed_history(path):
+    """(commit time, items) of every committed version of the feed at `path`, newest first."""
+    import subprocess
+    log = subprocess.run(["git", "log", "--format=%H %ct", "--", path], cwd=BASE_DIR,
+                         capture_output=True, text=True)
+    for line in log.stdout.splitlines():
+        commit, ts = line.split()
+        show = subprocess.Popen(["git", "show", f"{commit}:{path}"], cwd=BASE_DIR,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        try:
+            yield float(ts), list(feed_merge.iter_items(show.stdout))
+        finally:
+            show.stdout.close()
+            show.wait()
+
+
+def backfill(paths, history=False, db_path=None):
+    """Import feed files into the store, with `history` every committed version of them too."""
+    db = connect(db_path)
+    try:
+        for path in paths:
+            source = os.path.basename(path)
+            count = import_items(db, source, feed_merge.iter_items(os.path.join(BASE_DIR, path)),
+                                 os.stat(os.path.join(BASE_DIR, path)).st_mtime)
+            versions = 0
+            if history:
+                for seen, items in feed_history(path):
+                    count += import_items(db, source, items, seen)
+                    versions += 1
+            index_text(db)
+            db.commit()
+            stored = db.execute("SELECT count(*) FROM items WHERE source = ?", (source,)).fetchone()[0]
+            print(f"{source}: {count} items read" + (f" from {versions} commits" if history else "")
+                  + f", {stored} stored")
+    finally:
+        db.close()
+
+
+def stats(db_path=None):
+    db = connect(db_path)
+    try:
+        rows = db.execute(
+            """SELECT source, count(*), min(pub_ts), max(pub_ts) FROM items
+               GROUP BY source ORDER BY source"""
+        ).fetchall()
+    finally:
+        db.close()
+    for source, count, oldest, newest in rows:
+        span = ""
+        if oldest is not None:
+            span = f"  {time.strftime('%Y-%m-%d', time.gmtime(oldest))} .. {time.strftime('%Y-%m-%d', time.gmtime(newest))}"
+        print(f"{source:<32}{count:>8}{span}")
+
+
+def search_command(query, limit=SEARCH_LIMIT, db_path=None):
+    db = connect(db_path)
+    try:
+        results = list(itertools.islice(search(db, query), limit))
+    except sqlite3.OperationalError as e:
+        print(f"Bad query {query!r}: {e}")
+        sys.exit(2)
+    finally:
+        db.close()
+    for source, item, snippet in results:
+        ts = feed_merge.item_timestamp(item)
+        date = time.strftime("%Y-%m-%d %H:%M", time.gmtime(ts)) if ts is not None else "undated"
+        print(f"{date}  {source}\n  {item.get('title') or ''}\n  {snippet or ''}\n  {item.get('link') or ''}\n")
+    print(f"{len(results)} result(s) for {query!r}")
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["backfill"]:
+        # backfill [--history] [feed.xml ...]: defaults to every source feed in the repo
+        history = "--history" in args
+        paths = [a for a in args[1:] if not a.startswith("--")]
+        if not paths:
+            paths = sorted(n for n in os.listdir(BASE_DIR)
+                           if n.endswith(".xml") and n not in DERIVED_FEEDS)
+        backfill(paths, history)
+    elif args[:1] == ["search"] and len(args) > 1:
+        # search QUERY [--limit N]: best matches first, e.g. '"block deal" AND promoter'
+        limit = int(args[args.index("--limit") + 1]) if "--limit" in args else SEARCH_LIMIT
+        search_command(args[1], limit)
+    elif args[:1] in ([], ["stats"]):
+        stats()
+    else:
+        print("usage: item_store.py [stats | backfill [--history] [feed.xml ...] | search QUERY [--limit N]]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
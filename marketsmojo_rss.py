@@ -1,12 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
 import hashlib
+import http_client
+import http_cache
+import feed_writer
+import html_extract
+import run_metrics
 
 NEWS_URL = "https://www.marketsmojo.com/news"
 OUT_FILE = "marketsmojo_news.xml"
 
+CHANNEL = {
+    "title": "MarketsMojo – News (homepage)",
+    "link": NEWS_URL,
+    "description": "RSS scraped from https://www.marketsmojo.com/news",
+    "language": "en-IN",
+}
+
 HEADERS = {
     "User-Agent": (
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -15,38 +24,58 @@ HEADERS = {
     )
 }
 
+session = http_client.Session(HEADERS, name="marketsmojo")
+metrics = run_metrics.recorder("marketsmojo")
+
+# Only the results container is read; the page after it is never downloaded
+CONTAINER_ID = "news-results-container"
+MAX_PAGE_BYTES = 2 * 1024 * 1024  # give up on pages larger than this
 
-def fetch_html(url: str) -> str:
-    resp = requests.get(url, headers=HEADERS, timeout=20)
-    resp.raise_for_status()
-    return resp.text
 
+def fetch_html(url: str, output: str = None):
+    """(markup of the news results container, cache entry), markup being ""
+    if the page has none, or (None, None) if it is unchanged since the run
+    that produced `output`. The entry goes to http_cache.commit() once the
+    feed is written.
+
+    The page is streamed and the download stops once the container has
+    been read; the scripts and widgets after it are never fetched.
+    """
+    # Relative times ("12 minutes ago") change on every fetch; they are dropped
+    # so an unchanged page is recognised as such
+    markup, not_modified, entry = http_cache.get_element(
+        url, CONTAINER_ID, session=session, output=output, max_bytes=MAX_PAGE_BYTES,
+        volatile=CARD_TIME, timeout=20,
+    )
+    if not_modified:
+        return None, None
+    return markup or b"", entry
 
-def parse_cards(html: str):
-    soup = BeautifulSoup(html, "html.parser")
-    container = soup.find(id="news-results-container")
-    if not container:
-        return []
 
+# Selectors, compiled once on first use (see html_extract)
+CARDS = html_extract.XPath(
+    f"//*[@id='{CONTAINER_ID}']//div[" + html_extract.has_class("news-article-card") + "]"
+)
+CARD_LINK = html_extract.XPath(".//a[@href]")
+CARD_TITLE = html_extract.XPath(".//*[" + html_extract.has_class("card-title") + "]")
+CARD_BODY_P = html_extract.XPath(".//*[" + html_extract.has_class("card-body") + "]//p")
+CARD_TIME = html_extract.XPath(".//*[" + html_extract.has_class("article-card-footer") + "]//div")
+
+
+def parse_cards(html):
     articles = []
-    for card in container.select("div.news-article-card"):
+    for card in CARDS(html_extract.parse(html)):
         # first anchor inside card gives canonical article URL
-        a = card.find("a", href=True)
-        if not a:
+        a = CARD_LINK.first(card)
+        if a is None:
             continue
-        link = a["href"].strip()
+        link = a.get("href").strip()
 
         # title
-        title_el = card.select_one(".card-title")
-        title = title_el.get_text(strip=True) if title_el else ""
+        title = html_extract.text(CARD_TITLE.first(card))
 
         # description/snippet
-        body_p = card.select_one(".card-body p")
-        desc = body_p.get_text(" ", strip=True) if body_p else ""
-
-        # optional time text like "2 hours ago"
-        time_el = card.select_one(".article-card-footer div")
-        time_text = time_el.get_text(strip=True) if time_el else ""
+        desc = html_extract.text(CARD_BODY_P.first(card))
 
         if not title or not link:
             continue
@@ -56,66 +85,48 @@ def parse_cards(html: str):
                 "title": title,
                 "link": link,
                 "description": desc,
-                "time_text": time_text,
             }
         )
 
     return articles
 
 
-def rss_item(channel, art):
+def rss_item(art):
     title = art["title"]
     link = art["link"]
     desc = art["description"]
-    time_text = art.get("time_text")
-
-    if time_text:
-        desc = f"{desc}\nTime: {time_text}"
-
-    item = ET.SubElement(channel, "item")
-    ET.SubElement(item, "title").text = title
-    ET.SubElement(item, "link").text = link
-    ET.SubElement(item, "description").text = desc
 
     guid_src = (title + link).encode("utf-8", errors="ignore")
-    ET.SubElement(item, "guid").text = hashlib.md5(guid_src).hexdigest()
-
-    # no absolute timestamp on page; use build time
-    ET.SubElement(item, "pubDate").text = datetime.now(timezone.utc).strftime(
-        "%a, %d %b %Y %H:%M:%S GMT"
-    )
+    return {
+        "title": title,
+        "link": link,
+        "description": desc,
+        "guid": hashlib.md5(guid_src).hexdigest(),
+        # no absolute timestamp on page; use build time
+        "pubDate": datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT"),
+    }
 
 
 def build_rss(articles):
-    rss = ET.Element("rss", version="2.0")
-    channel = ET.SubElement(rss, "channel")
-
-    ET.SubElement(channel, "title").text = "MarketsMojo – News (homepage)"
-    ET.SubElement(channel, "link").text = NEWS_URL
-    ET.SubElement(channel, "description").text = (
-        "RSS scraped from https://www.marketsmojo.com/news"
-    )
-    ET.SubElement(channel, "language").text = "en-IN"
-    ET.SubElement(channel, "lastBuildDate").text = datetime.now(
-        timezone.utc
-    ).strftime("%a, %d %b %Y %H:%M:%S GMT")
-
-    for art in articles:
-        rss_item(channel, art)
-
-    tree = ET.ElementTree(rss)
-    tree.write(OUT_FILE, encoding="utf-8", xml_declaration=True)
+    # pubDate is the build time, so re-seen articles keep their first one
+    feed_writer.write_feed(OUT_FILE, CHANNEL, map(rss_item, articles), keep_first_seen=True, metrics=metrics)
 
 
+@metrics.run
 def main():
     print("Fetching:", NEWS_URL)
-    html = fetch_html(NEWS_URL)
+    html, cache_entry = fetch_html(NEWS_URL, output=OUT_FILE)
+    if html is None:
+        print("Page unchanged since last run; feed left as is.")
+        return
     print("Parsing cards…")
-    arts = parse_cards(html)
+    with metrics.stage("parse"):
+        arts = parse_cards(html)
     print("Found", len(arts), "articles.")
     if not arts:
         return
     build_rss(arts)
+    http_cache.commit(cache_entry)
     print("RSS written to", OUT_FILE)
 
 
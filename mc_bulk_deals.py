@@ -1,7 +1,11 @@
-import requests
+import http_client
 import time
 import os
-from datetime import datetime
+import http_cache
+import feed_writer
+import run_metrics
+from html import escape
+from urllib.parse import quote
 
 # ================= CONFIG =================
 BASE_URL = "https://www.nseindia.com"
@@ -16,9 +20,16 @@ HEADERS = {
     "Referer": "https://www.nseindia.com/report-details/display-bulk-and-block-deals"
 }
 
+CHANNEL = {
+    "title": "NSE Live Bulk & Block Deals",
+    "link": "https://www.nseindia.com",
+    "description": "Live feed of large transactions on NSE.",
+}
+
+metrics = run_metrics.recorder("nse")
+
 def get_deals():
-    session = requests.Session()
-    session.headers.update(HEADERS)
+    session = http_client.Session(HEADERS, name="nse")
 
     try:
         # STEP 1: Handshake
@@ -29,26 +40,32 @@ def get_deals():
 
         # STEP 2: Fetch the data
         print(f"Fetching Live Deals from: {API_URL}")
-        response = session.get(API_URL, timeout=15)
+        response = http_cache.get(API_URL, session=session, timeout=15, output=OUTPUT_FILE)
         
+        if response.not_modified:
+            print("Deals unchanged since last run; feed left as is.")
+            return None, None
+
         if response.status_code != 200:
             print(f"NSE returned status {response.status_code}. Retrying...")
-            return None
+            print("No data fetched. NSE might be blocking the GitHub IP.")
+            return None, None
 
-        data = response.json()
+        with metrics.stage("parse"):
+            data = response.json()
         bulk_deals = data.get('bulkDeals', [])
         block_deals = data.get('blockDeals', [])
         all_deals = bulk_deals + block_deals
         
         print(f"Found {len(all_deals)} live deals.")
-        return all_deals
+        return all_deals, response.cache_entry
 
     except Exception as e:
         print(f"Error connecting to NSE: {e}")
-        return None
+        return None, None
 
-def build_rss(deals):
-    items_xml = ""
+def build_items(deals):
+    """Yields one RSS item dict per deal."""
     for deal in deals:
         symbol = deal.get('symbol', 'N/A')
         client = deal.get('clientName', 'Unknown')
@@ -58,42 +75,34 @@ def build_rss(deals):
         date = deal.get('dealDate', '')
         
         title = f"{action}: {symbol} ({qty} qty) by {client}"
-        link = f"https://www.nseindia.com/get-quotes/equity?symbol={symbol}"
+        link = f"https://www.nseindia.com/get-quotes/equity?symbol={quote(str(symbol))}"
         
         description = f"""
-        <strong>Symbol:</strong> {symbol}<br/>
-        <strong>Party:</strong> {client}<br/>
-        <strong>Action:</strong> {action}<br/>
+        <strong>Symbol:</strong> {escape(str(symbol))}<br/>
+        <strong>Party:</strong> {escape(str(client))}<br/>
+        <strong>Action:</strong> {escape(str(action))}<br/>
         <strong>Quantity:</strong> {qty}<br/>
         <strong>Price:</strong> ₹{price}<br/>
-        <strong>Date:</strong> {date}
+        <strong>Date:</strong> {escape(str(date))}
         """
 
-        items_xml += f"""
-    <item>
-      <title><![CDATA[{title}]]></title>
-      <link>{link}</link>
-      <guid isPermaLink="false">{symbol}-{date}-{qty}-{price}</guid>
-      <pubDate>{datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0000")}</pubDate>
-      <description><![CDATA[{description}]]></description>
-    </item>"""
+        yield {
+            "title": title,
+            "link": link,
+            "guid": f"{symbol}-{date}-{qty}-{price}",
+            "permalink": False,
+            "pubDate": feed_writer.rfc822_now(),
+            "description": description,
+        }
 
-    return f"""<?xml version="1.0" encoding="UTF-8"?>
-<rss version="2.0">
-  <channel>
-    <title>NSE Live Bulk &amp; Block Deals</title>
-    <link>https://www.nseindia.com</link>
-    <description>Live feed of large transactions on NSE.</description>
-    {items_xml}
-  </channel>
-</rss>"""
-
-if __name__ == "__main__":
-    deals = get_deals()
+@metrics.run
+def main():
+    deals, cache_entry = get_deals()
     if deals:
-        rss_content = build_rss(deals)
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            f.write(rss_content)
+        # pubDate is the fetch time, so re-seen deals keep their first one
+        feed_writer.write_feed(OUTPUT_FILE, CHANNEL, build_items(deals), keep_first_seen=True, metrics=metrics)
+        http_cache.commit(cache_entry)
         print(f"Successfully wrote {OUTPUT_FILE}")
-    else:
-        print("No data fetched. NSE might be blocking the GitHub IP.")
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,125 @@
+import json
+import os
 import subprocess
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 
+import run_metrics
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MAX_WORKERS = 4          # feeds refreshed at the same time
+DEFAULT_TIMEOUT = 90     # seconds per task unless overridden below
+SUMMARY_FILE = "run_summary.json"
+
+# (command, name, timeout in seconds)
 TASKS = [
-    ([sys.executable, "Dhan-Scanx-News.ps1"], "dhan scanx feed"),
-    ([sys.executable, "marketsmojo_rss.py"], "marketsmojo feed"),
+    ([sys.executable, "dhan_scanx_rss.py"], "dhan scanx feeds", DEFAULT_TIMEOUT),
+    ([sys.executable, "stockwatch_rss.py"], "stockwatch feed", DEFAULT_TIMEOUT),
+    ([sys.executable, "capitalmarket_rss.py"], "capitalmarket feed", 180),
+    ([sys.executable, "skicapital_scraper.py"], "skicapital feed", 300),
+    ([sys.executable, "whalesbook_rss.py"], "whalesbook feed", DEFAULT_TIMEOUT),
+    ([sys.executable, "trendlyne_to_rss.py"], "trendlyne feed", DEFAULT_TIMEOUT),
+    ([sys.executable, "marketsmojo_rss.py"], "marketsmojo feed", DEFAULT_TIMEOUT),
+    ([sys.executable, "buzzing_stocks_rss.py"], "buzzing stocks feed", DEFAULT_TIMEOUT),
+    ([sys.executable, "mc_bulk_deals.py"], "bulk deals feed", DEFAULT_TIMEOUT),
+]
+
+# Stages that read the feeds above; run one after another once all of them are done
+POST_TASKS = [
+    ([sys.executable, "feed_dedup.py"], "dedup stage", DEFAULT_TIMEOUT),
+    ([sys.executable, "feed_master.py"], "master feed", DEFAULT_TIMEOUT),
+    ([sys.executable, "symbol_feeds.py"], "symbol feeds", DEFAULT_TIMEOUT),
+    ([sys.executable, "search_feeds.py"], "search feeds", DEFAULT_TIMEOUT),
 ]
 
-def run_task(cmd, name):
+def run_task(cmd, name, timeout=DEFAULT_TIMEOUT):
+    """Run one generator and return a result record for the summary."""
+    result = {"name": name, "command": cmd, "ok": False, "status": "failed",
+              "returncode": None, "seconds": 0.0, "error": None}
+    start = time.monotonic()
     try:
-        subprocess.run(cmd, check=True, timeout=90)
-        print("OK:", name)
-        return True
+        proc = subprocess.run(
+            cmd, cwd=BASE_DIR, timeout=timeout,
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+            # Generators tag their run metrics with this run's ID
+            env={**os.environ, "FEED_RUN_ID": run_metrics.RUN_ID},
+        )
+        result["returncode"] = proc.returncode
+        # Print the task's output in one block so parallel runs don't interleave
+        if proc.stdout:
+            print(f"----- {name} -----\n{proc.stdout.rstrip()}")
+        if proc.returncode == 0:
+            result["ok"] = True
+            result["status"] = "ok"
+            print("OK:", name)
+        else:
+            result["error"] = f"exit code: {proc.returncode}"
+            print("FAILED:", name, "=>", result["error"])
     except subprocess.TimeoutExpired as e:
+        result["status"] = "timeout"
+        result["error"] = f"timeout: {e}"
         print("FAILED:", name, "=> timeout:", e)
-        return False
-    except subprocess.CalledProcessError as e:
-        print("FAILED:", name, "=> exit code:", e.returncode)
-        return False
     except FileNotFoundError as e:
+        result["error"] = f"file not found: {e}"
         print("FAILED:", name, "=> file not found:", e)
-        return False
     except Exception as e:
+        result["error"] = str(e)
         print("FAILED:", name, "=>", e)
-        return False
+    result["seconds"] = round(time.monotonic() - start, 3)
+    return result
+
+def run_all(tasks=TASKS, max_workers=MAX_WORKERS, post_tasks=POST_TASKS):
+    """Run all tasks in a bounded pool, then the post tasks in order;
+    results come back in list order."""
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(run_task, cmd, name, timeout) for cmd, name, timeout in tasks]
+        results = [f.result() for f in futures]
+    return results + [run_task(cmd, name, timeout) for cmd, name, timeout in post_tasks]
 
 def main():
-    ok = True
-    for cmd, name in TASKS:
-        ok = run_task(cmd, name) and ok
+    # --daemon: stay resident and poll each source on its own schedule
+    if "--daemon" in sys.argv[1:]:
+        import feed_daemon
+        return feed_daemon.main()
+    # --in-process: import every source once and refresh them on one event loop
+    in_process = "--in-process" in sys.argv[1:]
+    started = datetime.now(timezone.utc)
+    start = time.monotonic()
+    run_metrics.rotate()
+    metrics_offset = run_metrics.runs_size()
+    if in_process:
+        import feed_engine
+        results = feed_engine.run()
+    else:
+        results = run_all()
+    ok = all(r["ok"] for r in results)
+
+    # Per-stage records the generators appended during this run
+    records = run_metrics.read_runs(metrics_offset, run_id=run_metrics.RUN_ID)
+    run_metrics.write_prometheus(records)
+    slowest = [
+        {"source": source, "stage": stage, "seconds": seconds}
+        for seconds, source, stage in run_metrics.slowest_stages(records)
+    ]
+
+    summary = {
+        "run_id": run_metrics.RUN_ID,
+        "started": started.isoformat(timespec="seconds"),
+        "mode": "in-process" if in_process else "subprocess",
+        "wall_seconds": round(time.monotonic() - start, 3),
+        "task_seconds": round(sum(r["seconds"] for r in results), 3),
+        "ok": ok,
+        "succeeded": sum(1 for r in results if r["ok"]),
+        "failed": sum(1 for r in results if not r["ok"]),
+        "slowest_stages": slowest,
+        "tasks": results,
+    }
+    with open(os.path.join(BASE_DIR, SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps({k: v for k, v in summary.items() if k != "tasks"}))
 
     # Optional: if you want GitHub Actions to still succeed even when one feed fails,
     # keep exit code 0 always. If you want Actions to fail when any feed fails,
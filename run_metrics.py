@@ -0,0 +1,245 @@
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+METRICS_DIR = os.path.join(BASE_DIR, "metrics")
+RUNS_FILE = os.path.join(METRICS_DIR, "runs.jsonl")   # one JSON record per generator run
+MAX_RUNS_BYTES = 4 * 1024 * 1024  # see rotate()
+PROM_FILE = os.path.join(METRICS_DIR, "feeds.prom")   # Prometheus text format, written by run_all
+
+# Stages in pipeline order. connect, ttfb and download are summed over the
+# requests of a run; the others are wall time spent in the stage.
+STAGES = ("connect", "ttfb", "download", "parse", "enrich", "render", "write")
+COUNTS = ("items", "bytes", "requests", "retries", "blocked", "http_cache_hits", "body_cache_hits")
+
+# Shared by every record of one run_all invocation; a generator run on its
+# own gets an ID of its own
+RUN_ID = os.environ.get("FEED_RUN_ID") or uuid.uuid4().hex[:12]
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+class Recorder:
+    """Stage timings and counters of one source's current run.
+
+    Named like the source's HTTP session, so http_pool and http_cache can
+    add request timings and cache hits to it. Safe to use from worker
+    threads. Stages nest: time spent in an inner stage is not also charged
+    to the outer one.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = dict.fromkeys(STAGES, 0.0)
+            self.counts = dict.fromkeys(COUNTS, 0)
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def request(self, connect, ttfb, download, nbytes, blocked=False):
+        """Account one HTTP request (see http_pool.PooledSession); `blocked`
+        marks a 403 or 429 answer."""
+        with self._lock:
+            self.counts["blocked"] += int(blocked)
+            self.stages["connect"] += connect
+            self.stages["ttfb"] += ttfb
+            self.stages["download"] += download
+            self.counts["requests"] += 1
+            self.counts["bytes"] += nbytes
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as `name`."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        now = time.perf_counter()
+        if stack:
+            outer = stack[-1]
+            self.add(outer[0], now - outer[1])
+        frame = [name, now]
+        stack.append(frame)
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            stack.pop()
+            self.add(name, now - frame[1])
+            if stack:
+                stack[-1][1] = now
+
+    def timed(self, items, stage):
+        """Iterate `items`, charging the time spent producing each to `stage`."""
+        it = iter(items)
+        while True:
+            with self.stage(stage):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def run(self, func):
+        """Decorator for a source's entry point: resets the recorder, then
+        appends the run's record to RUNS_FILE when the entry point returns."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            self.reset()
+            started = datetime.now(timezone.utc)
+            start = time.perf_counter()
+            error = None
+            try:
+                return func(*args, **kwargs)
+            except BaseException as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                self.emit(started, time.perf_counter() - start, error)
+        return wrapper
+
+    def record(self, started, seconds, error=None):
+        with self._lock:
+            return {
+                "run_id": RUN_ID,
+                "source": self.name,
+                "started": started.isoformat(timespec="seconds"),
+                "seconds": round(seconds, 4),
+                "ok": error is None,
+                "error": error,
+                "stages": {k: round(v, 4) for k, v in self.stages.items()},
+                "counts": dict(self.counts),
+            }
+
+    def emit(self, started, seconds, error=None):
+        record = self.record(started, seconds, error)
+        try:
+            os.makedirs(METRICS_DIR, exist_ok=True)
+            # One short line per append, so concurrent generators don't interleave
+            with open(RUNS_FILE, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+        except OSError as e:
+            print(f"Warning: could not write run metrics: {e}")
+        return record
+
+
+def recorder(name):
+    """The Recorder for `name`, created on first use."""
+    with _recorders_lock:
+        rec = _recorders.get(name)
+        if rec is None:
+            rec = _recorders[name] = Recorder(name)
+        return rec
+
+
+def rotate():
+    """Move RUNS_FILE to RUNS_FILE.1, replacing the previous one, once it has
+    grown past MAX_RUNS_BYTES.
+
+    Called before a run starts, never during one, so an offset taken with
+    runs_size() stays valid until the run's records have been read.
+    """
+    if runs_size() >= MAX_RUNS_BYTES:
+        try:
+            os.replace(RUNS_FILE, RUNS_FILE + ".1")
+        except OSError as e:
+            print(f"Warning: could not rotate run metrics: {e}")
+
+
+def runs_size():
+    """Current size of RUNS_FILE; pass to read_runs() to read only newer records."""
+    try:
+        return os.path.getsize(RUNS_FILE)
+    except OSError:
+        return 0
+
+
+def read_runs(offset=0, run_id=None):
+    """Records appended to RUNS_FILE after byte `offset`, optionally of one run only."""
+    records = []
+    try:
+        with open(RUNS_FILE, encoding="utf-8") as f:
+            f.seek(offset)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if run_id is None or record.get("run_id") == run_id:
+                    records.append(record)
+    except OSError:
+        pass
+    return records
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_label_value(v)}"' for k, v in labels.items()) + "}"
+
+
+def to_prometheus(records):
+    """Prometheus text exposition of run records; the latest record of each source wins."""
+    latest = {}
+    for record in records:
+        latest[record["source"]] = record
+
+    metrics = [
+        ("feed_run_seconds", "gauge", "Wall time of the last run of each source",
+         lambda r: [({}, r["seconds"])]),
+        ("feed_run_ok", "gauge", "1 if the last run finished without an exception",
+         lambda r: [({}, int(r["ok"]))]),
+        ("feed_last_run_timestamp_seconds", "gauge", "Start time of the last run",
+         lambda r: [({}, datetime.fromisoformat(r["started"]).timestamp())]),
+        ("feed_stage_seconds", "gauge", "Seconds per stage in the last run",
+         lambda r: [({"stage": k}, v) for k, v in r["stages"].items()]),
+    ]
+    metrics += [
+        (f"feed_{name}", "gauge", f"{name.replace('_', ' ').capitalize()} in the last run",
+         lambda r, name=name: [({}, r["counts"].get(name, 0))])
+        for name in COUNTS
+    ]
+
+    lines = []
+    for metric, kind, help_text, samples in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for source in sorted(latest):
+            for labels, value in samples(latest[source]):
+                lines.append(f"{metric}{_labels(source=source, **labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(records, path=PROM_FILE):
+    """Write `records` as a Prometheus text file, atomically (for node_exporter's
+    textfile collector)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(to_prometheus(records))
+    os.replace(path + ".tmp", path)
+
+
+def slowest_stages(records, top=5):
+    """(seconds, source, stage) of the largest stage timings across `records`."""
+    timings = [(v, r["source"], k) for r in records for k, v in r["stages"].items() if v]
+    return sorted(timings, reverse=True)[:top]
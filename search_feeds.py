@@ -0,0 +1,79 @@
+import json
+import os
+import re
+import sqlite3
+
+import feed_master
+import feed_merge
+import feed_writer
+import item_store
+
+# ================== CONFIG ==================
+OUT_DIR = "searches"
+INDEX_FILE = os.path.join(OUT_DIR, "index.json")
+MAX_ITEMS_PER_SEARCH = 50
+
+# (feed name, title, FTS5 query); see item_store.search() for the query syntax
+SEARCHES = [
+    ("block-deal-promoter", "Block deals involving promoters", '"block deal" AND promoter'),
+    ("bulk-deal-promoter", "Bulk deals involving promoters", '"bulk deal" AND promoter'),
+    ("order-wins", "Order wins", '"bags order" OR "order win" OR "secures order" OR "receives order"'),
+    ("pledge", "Promoter share pledges", "promoter AND (pledge OR pledged OR encumbrance)"),
+]
+
+# Source feeds searched: the master feed's, with the label and pubDate zone it
+# gives them. The Dhan category feeds are left out: they repeat the combined
+# Dhan feed's articles under links that differ by section.
+LABELS = {path: label for path, label, _ in feed_master.SOURCES}
+ZONES = {path: zone for path, _, zone in feed_master.SOURCES}
+
+
+def feed_path(name):
+    return os.path.join(OUT_DIR, re.sub(r"[^\w.-]", "_", name) + ".xml")
+
+
+def search_items(db, query, max_items=MAX_ITEMS_PER_SEARCH):
+    """Newest `max_items` source items matching `query`, labelled like the
+    master feed's. An item stored without a pubDate is dated by when it was
+    first seen, so it ranks and ages like any other."""
+    items = []
+    for source, item, _ in item_store.search(db, query, sources=list(LABELS)):
+        utc = feed_master.to_utc(item.get("pubDate"), ZONES.get(source))
+        if utc:
+            item["pubDate"] = utc
+        item.setdefault("category", LABELS[source])
+        items.append(item)
+    items.sort(key=feed_merge.sort_key)
+    return items[:max_items]
+
+
+def main():
+    db = item_store.connect()
+    os.makedirs(OUT_DIR, exist_ok=True)
+    summary = {}
+    try:
+        for name, title, query in SEARCHES:
+            try:
+                items = search_items(db, query)
+            except sqlite3.OperationalError as e:
+                print(f"Saved search {name}: bad query {query!r}: {e}")
+                continue
+            channel = {
+                "title": f"Indian Market News – {title}",
+                "description": f"Items from all sources matching {query}",
+                "language": "en-IN",
+            }
+            path = feed_path(name)
+            feed_writer.write_items(path, feed_writer.published(channel, path), items)
+            summary[name] = {"title": title, "query": query, "items": len(items), "feed": path}
+    finally:
+        db.close()
+
+    with open(INDEX_FILE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+    os.replace(INDEX_FILE + ".tmp", INDEX_FILE)
+    print(f"Search feeds: {len(summary)} of {len(SEARCHES)} saved searches -> {OUT_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
-import xml.etree.ElementTree as ET
+from body_cache import BodyCache
+import http_client
+import http_cache
+import feed_merge
+import feed_writer
+import html_extract
+import run_metrics
 from datetime import datetime, timezone
 import hashlib
 import re
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urljoin
 
 NEWS_URL = "https://www.skicapital.net/news/stock-alert"
 BASE_URL = "https://www.skicapital.net"
@@ -13,7 +20,19 @@ OUT_FILE = "skicapital_news.xml"
 # Configuration
 MAX_PAGES = 3  # Set to None to fetch all pages
 FETCH_FULL_CONTENT = True  # Set False for faster scraping (metadata only)
-DELAY_BETWEEN_REQUESTS = 1  # Seconds to wait between requests (be polite)
+
+# Politeness: article pages are fetched in parallel but the aggregate
+# request rate is held to REQUESTS_PER_SECOND by a token bucket
+REQUESTS_PER_SECOND = 2.0  # Sustained article fetch rate
+BURST = 4                  # Requests allowed back to back after idling
+MAX_WORKERS = 4            # Concurrent article fetches
+
+CHANNEL = {
+    "title": "SKI Capital – Stock Alert News",
+    "link": NEWS_URL,
+    "description": "Stock alert news from SKI Capital Services - Indian stock market updates",
+    "language": "en-IN",
+}
 
 HEADERS = {
     "User-Agent": (
@@ -23,14 +42,69 @@ HEADERS = {
     )
 }
 
+session = http_client.Session(HEADERS, name="skicapital")
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `burst` saved up"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+rate_limiter = TokenBucket(REQUESTS_PER_SECOND, BURST)
+
+# Extracted bodies keyed by article link; only unseen links are fetched
+body_cache = BodyCache("skicapital")
+
+metrics = run_metrics.recorder("skicapital")
+
+# Selectors, compiled once on first use (see html_extract)
+LISTING_ROWS = html_extract.XPath("//tr[count(td) = 3]")
+ROW_CELLS = html_extract.XPath("td")
+CELL_LINK = html_extract.XPath(".//a[@href]")
+POSTBACK_LINKS = html_extract.XPath("//a[contains(@href, '__doPostBack')]")
+FORM_ACTION = html_extract.XPath("//form/@action")
+HIDDEN_INPUTS = html_extract.XPath("//form//input[@type='hidden'][@name]")
+ARTICLE_CELL = html_extract.XPath("//td[contains(@style, 'text-align: justify')]")
+DO_POSTBACK = re.compile(r"__doPostBack\(\s*'([^']*)'\s*,\s*'([^']*)'\s*\)")
+POWERED_BY = re.compile(r"Powered by.*$", re.IGNORECASE)
+
 
 def fetch_html(url: str) -> str:
     """Fetch HTML content from URL"""
-    resp = requests.get(url, headers=HEADERS, timeout=20)
+    resp = session.get(url, timeout=20)
     resp.raise_for_status()
     return resp.text
 
 
+def fetch_listing(url: str):
+    """Fetch a listing page: the response, or None if unchanged since the
+    last feed was built"""
+    resp = http_cache.get(url, session=session, timeout=20, output=OUT_FILE)
+    resp.raise_for_status()
+    if resp.not_modified:
+        return None
+    return resp
+
+
 def parse_date_time(date_str: str, time_str: str) -> str:
     """Convert date and time strings to RFC 822 format for RSS"""
     try:
@@ -46,164 +120,210 @@ def parse_date_time(date_str: str, time_str: str) -> str:
         return datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT")
 
 
-def parse_listing(html: str):
-    """Parse the listing page to extract article links"""
-    soup = BeautifulSoup(html, "html.parser")
+def parse_listing(html):
+    """Parse the listing page (HTML or a parsed tree) to extract article links"""
+    doc = html_extract.parse(html)
     articles = []
 
-    # Find all table rows
-    for row in soup.find_all("tr"):
-        cells = row.find_all("td")
-        if len(cells) == 3:
-            date_cell = cells[0]
-            time_cell = cells[1]
-            heading_cell = cells[2]
-
-            # Extract date and time
-            date_text = date_cell.get_text(strip=True)
-            time_text = time_cell.get_text(strip=True)
-
-            # Skip header row or empty rows
-            if date_text in ["DATE", ""] or not date_text:
-                continue
-
-            # Find link in heading cell
-            link_tag = heading_cell.find("a", href=True)
-            if link_tag:
-                title = link_tag.get_text(strip=True)
-                link = link_tag["href"]
-
-                # Make absolute URL if needed
-                if not link.startswith("http"):
-                    link = BASE_URL + link
-
-                articles.append({
-                    "date": date_text,
-                    "time": time_text,
-                    "title": title,
-                    "link": link
-                })
+    # Rows with exactly date, time and heading cells
+    for row in LISTING_ROWS(doc):
+        date_cell, time_cell, heading_cell = ROW_CELLS(row)
+
+        # Extract date and time
+        date_text = html_extract.text(date_cell)
+        time_text = html_extract.text(time_cell)
+
+        # Skip header row or empty rows
+        if date_text in ["DATE", ""] or not date_text:
+            continue
+
+        # Find link in heading cell
+        link_tag = CELL_LINK.first(heading_cell)
+        if link_tag is not None:
+            title = html_extract.text(link_tag)
+            link = link_tag.get("href")
+
+            # Make absolute URL if needed
+            if not link.startswith("http"):
+                link = BASE_URL + link
+
+            articles.append({
+                "date": date_text,
+                "time": time_text,
+                "title": title,
+                "link": link
+            })
 
     return articles
 
 
-def get_pagination_links(html: str) -> list:
-    """Extract pagination links from the page"""
-    soup = BeautifulSoup(html, "html.parser")
-    pagination_links = []
+def pager_postbacks(html) -> dict:
+    """Pager links of the listing (HTML or a parsed tree) as
+    {page number: (event target, event argument)}.
+
+    The listing is an ASP.NET page: its pager links run
+    javascript:__doPostBack(target, 'Page$N') rather than pointing at a URL.
+    """
+    postbacks = {}
+    for a in POSTBACK_LINKS(html_extract.parse(html)):
+        m = DO_POSTBACK.search(a.get("href"))
+        if not m:
+            continue
+        target, argument = m.groups()
+        label = html_extract.text(a)
+        if argument.startswith("Page$") and argument[5:].isdigit():
+            postbacks[int(argument[5:])] = (target, argument)
+        elif label.isdigit():
+            postbacks[int(label)] = (target, argument)
+    return postbacks
+
+
+def fetch_postback(doc, target: str, argument: str) -> str:
+    """Replay an ASP.NET postback from the page `doc`, carrying its hidden
+    form state (__VIEWSTATE, __EVENTVALIDATION, ...) forward"""
+    form = {el.get("name"): el.get("value") or "" for el in HIDDEN_INPUTS(doc)}
+    form["__EVENTTARGET"] = target
+    form["__EVENTARGUMENT"] = argument
+    action = FORM_ACTION(doc)
+    url = urljoin(NEWS_URL, action[0]) if action and action[0] else NEWS_URL
+    rate_limiter.acquire()
+    resp = session.post(url, data=form, headers={"Referer": NEWS_URL}, timeout=20)
+    resp.raise_for_status()
+    return resp.text
+
 
-    # Look for pagination links
-    # The structure seems to be: << < 1 2 3 ... > >>
-    # Find all anchor tags that might be pagination
-    for link in soup.find_all("a", href=True):
-        href = link["href"]
-        # Check if it looks like a pagination link
-        # Usually contains page parameter or similar
-        if "page=" in href.lower() or re.search(r"/\d+/?$", href):
-            if not href.startswith("http"):
-                href = BASE_URL + href
-            pagination_links.append(href)
+def iter_listing_pages(html: str, max_pages=MAX_PAGES, known_links=frozenset()):
+    """Yield (page number, articles) for each listing page, starting from
+    the HTML of page 1.
+
+    Page N+1 is only requested once the caller asks for it, so work the
+    caller starts on page N's articles overlaps that request. Stops after
+    `max_pages` (None for all), when there is no next page, or after a page
+    whose links are all in `known_links` (the previous output).
+    """
+    page_num = 1
+    while True:
+        with metrics.stage("parse"):
+            doc = html_extract.parse(html)
+            articles = parse_listing(doc)
+        yield page_num, articles
+
+        if not articles or (max_pages and page_num >= max_pages):
+            return
+        if all(art["link"] in known_links for art in articles):
+            print(f"  Page {page_num} holds only articles already in the feed; stopping.")
+            return
+        postback = pager_postbacks(doc).get(page_num + 1)
+        if postback is None:
+            return
+
+        page_num += 1
+        print(f"\nFetching page {page_num}...")
+        try:
+            html = fetch_postback(doc, *postback)
+        except Exception as e:
+            print(f"  Warning: Error fetching page {page_num}: {e}")
+            return
+
+
+def article_text(html) -> str:
+    """Plain text of an article's content cell, or "" if there is none.
+
+    Bold runs (section headers) are kept once each, and a text fragment
+    repeated verbatim later in the cell is dropped, as before; both checks
+    are set lookups, so the walk is linear in the size of the cell.
+    """
+    content_td = ARTICLE_CELL.first(html_extract.parse(html))
+    if content_td is None:
+        return ""
 
-    return pagination_links
+    content_parts = []
+    seen = set()
+
+    def add(text):
+        text = text.strip() if text else ""
+        if text and text not in seen:
+            seen.add(text)
+            content_parts.append(text)
+
+    def walk(el):
+        add(el.text)
+        for child in el:
+            if child.tag == "b":
+                # Bold text (section headers)
+                bold = html_extract.text(child)
+                if bold:
+                    content_parts.append(bold)
+            elif isinstance(child.tag, str):
+                walk(child)
+            add(child.tail)
+
+    walk(content_td)
+    content = html_extract.normalize(" ".join(content_parts))
+    return POWERED_BY.sub("", content).strip()
 
 
 def fetch_article_content(url: str) -> str:
     """Fetch and extract main content from article page"""
     try:
-        html = fetch_html(url)
-        soup = BeautifulSoup(html, "html.parser")
-
-        # Look for the article content
-        # Method 1: td with text-align: justify
-        content_td = soup.find("td", style=lambda s: s and "text-align: justify" in s)
-
-        if content_td:
-            # Extract all text, handling <P> tags properly
-            content_parts = []
-            for element in content_td.descendants:
-                if element.name == "b":
-                    # Bold text (section headers)
-                    text = element.get_text(strip=True)
-                    if text:
-                        content_parts.append(f"\n{text}\n")
-                elif isinstance(element, str):
-                    text = element.strip()
-                    if text and text not in content_parts:
-                        content_parts.append(text)
-
-            content = " ".join(content_parts)
-
-            # Clean up
-            content = re.sub(r"\s+", " ", content)  # Multiple spaces
-            content = re.sub(r"Powered by.*$", "", content, flags=re.IGNORECASE)
-
-            return content.strip()
-
-        return ""
+        rate_limiter.acquire()
+        return article_text(fetch_html(url))
     except Exception as e:
         print(f"  Warning: Error fetching content from {url}: {e}")
         return ""
 
 
-def rss_item(channel, art, include_full_content=True):
-    """Create RSS item element"""
+def content_future(pool, art) -> Future:
+    """Future for an article's body: resolved from the cache, or fetched
+    through `pool`"""
+    body = body_cache.get(art["link"])
+    if body is not None:
+        metrics.count("body_cache_hits")
+        done = Future()
+        done.set_result(body)
+        return done
+
+    def job():
+        print(f"  Fetching content: {art['title'][:60]}...")
+        body = fetch_article_content(art["link"])
+        body_cache.set(art["link"], body)
+        return body
+
+    return pool.submit(job)
+
+
+def rss_item(art, description=""):
+    """Create RSS item dict"""
     title = art["title"]
     link = art["link"]
     date_str = art["date"]
     time_str = art["time"]
 
-    item = ET.SubElement(channel, "item")
-    ET.SubElement(item, "title").text = title
-    ET.SubElement(item, "link").text = link
-
-    # Fetch full article content if requested
-    description = ""
-    if include_full_content:
-        description = fetch_article_content(link)
-        time.sleep(DELAY_BETWEEN_REQUESTS)  # Be polite
-
     if not description:
         description = f"Posted: {date_str} at {time_str}"
 
-    ET.SubElement(item, "description").text = description
-
-    # Use link as GUID (permanent link)
-    ET.SubElement(item, "guid", isPermaLink="true").text = link
-
-    # Parse and add publication date
-    pub_date = parse_date_time(date_str, time_str)
-    ET.SubElement(item, "pubDate").text = pub_date
+    return {
+        "title": title,
+        "link": link,
+        "description": description,
+        # Use link as GUID (permanent link)
+        "guid": link,
+        "permalink": True,
+        "pubDate": parse_date_time(date_str, time_str),
+        "category": "Stock Alert",
+    }
 
-    # Optional: Add category
-    ET.SubElement(item, "category").text = "Stock Alert"
 
-
-def build_rss(articles, include_full_content=True):
+def build_rss(articles, descriptions):
     """Build RSS feed XML"""
-    rss = ET.Element("rss", version="2.0")
-    channel = ET.SubElement(rss, "channel")
-
-    ET.SubElement(channel, "title").text = "SKI Capital – Stock Alert News"
-    ET.SubElement(channel, "link").text = NEWS_URL
-    ET.SubElement(channel, "description").text = (
-        "Stock alert news from SKI Capital Services - Indian stock market updates"
-    )
-    ET.SubElement(channel, "language").text = "en-IN"
-    ET.SubElement(channel, "lastBuildDate").text = datetime.now(
-        timezone.utc
-    ).strftime("%a, %d %b %Y %H:%M:%S GMT")
-
     print(f"\nBuilding RSS items ({len(articles)} total)...")
-    for i, art in enumerate(articles, 1):
-        if include_full_content:
-            print(f"  [{i}/{len(articles)}] {art['title'][:60]}...")
-        rss_item(channel, art, include_full_content)
+    items = (rss_item(art, description) for art, description in zip(articles, descriptions))
 
-    tree = ET.ElementTree(rss)
-    ET.indent(tree, space="  ")  # Pretty print
-    tree.write(OUT_FILE, encoding="utf-8", xml_declaration=True)
+    # Merge with the previous feed so articles that scrolled off are kept
+    feed_writer.write_feed(OUT_FILE, CHANNEL, items, metrics=metrics)
 
 
+@metrics.run
 def main():
     print("="*60)
     print("SKI Capital Stock Alert Scraper")
@@ -211,41 +331,57 @@ def main():
     print(f"Source: {NEWS_URL}")
     print(f"Max pages: {MAX_PAGES if MAX_PAGES else 'All'}")
     print(f"Full content: {FETCH_FULL_CONTENT}")
+    print(f"Rate limit: {REQUESTS_PER_SECOND}/s (burst {BURST}, {MAX_WORKERS} workers)")
     print("="*60)
 
-    all_articles = []
-    page_num = 1
-
     # Fetch first page
-    print(f"\nFetching page {page_num}...")
-    html = fetch_html(NEWS_URL)
-    articles = parse_listing(html)
-    print(f"  Found {len(articles)} articles")
-    all_articles.extend(articles)
+    print("\nFetching page 1...")
+    listing = fetch_listing(NEWS_URL)
+    if listing is None:
+        print("  Listing unchanged since last run; feed left as is.")
+        return
+    html = listing.text
 
-    # For now, we'll just fetch the first page
-    # Pagination in ASP.NET sites often requires POST with ViewState
-    # which is complex. If you need pagination, we can enhance this.
+    # Links of the previous output: paging stops at the first page made only of these
+    known_links = {feed_merge.item_key(item) for item in feed_merge.iter_items(OUT_FILE)}
 
-    if not all_articles:
+    unique_articles = []
+    seen_links = set()
+    bodies = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        for page_num, articles in iter_listing_pages(html, MAX_PAGES, known_links):
+            print(f"  Found {len(articles)} articles")
+            # Bodies for this page are queued before the next page is requested
+            for art in articles:
+                if art["link"] in seen_links:
+                    continue
+                seen_links.add(art["link"])
+                unique_articles.append(art)
+                if FETCH_FULL_CONTENT:
+                    bodies.append(content_future(pool, art))
+        if FETCH_FULL_CONTENT:
+            with metrics.stage("enrich"):
+                descriptions = [body.result() for body in bodies]
+        else:
+            descriptions = [""] * len(unique_articles)
+    if FETCH_FULL_CONTENT:
+        body_cache.save()
+        print(f"  Article bodies: {body_cache.stats()}")
+
+    if not unique_articles:
         print("\nNo articles found!")
         return
 
-    # Remove duplicates based on link
-    seen_links = set()
-    unique_articles = []
-    for art in all_articles:
-        if art["link"] not in seen_links:
-            seen_links.add(art["link"])
-            unique_articles.append(art)
-
     print(f"\nTotal unique articles: {len(unique_articles)}")
     print("\nSample articles:")
     for art in unique_articles[:5]:
         print(f"  [{art['date']} {art['time']}] {art['title'][:65]}...")
 
     # Build RSS feed
-    build_rss(unique_articles, FETCH_FULL_CONTENT)
+    build_rss(unique_articles, descriptions)
+    # Articles whose body could not be fetched are retried while the listing is unchanged
+    if all(descriptions) or not FETCH_FULL_CONTENT:
+        http_cache.commit(listing.cache_entry)
 
     print(f"\n{'='*60}")
     print(f"✓ RSS feed saved to: {OUT_FILE}")
@@ -1,9 +1,12 @@
-import requests
 import base64
 import urllib.parse
 from datetime import datetime
 import json
 import re
+import http_client
+import http_cache
+import feed_writer
+import run_metrics
 
 # ================== CONFIG ==================
 # Updated endpoint based on your input
@@ -17,6 +20,17 @@ HEADERS_API = {
     "Referer": "https://www.stockwatch.live/"
 }
 
+CHANNEL = {
+    "title": "Stockwatch - Key Events",
+    "link": "https://www.stockwatch.live/",
+    "description": "Real-time corporate announcements, deals, and financial results.",
+    "language": "en-in",
+    "self_link": API_URL,
+}
+
+session = http_client.Session(HEADERS_API, name="stockwatch")
+metrics = run_metrics.recorder("stockwatch")
+
 # ================= HELPERS ==================
 def generate_token(uuid_str):
     """
@@ -53,30 +67,8 @@ def clean_xml_text(text):
     return text
 
 # ================= MAIN ==================
-def fetch_stockwatch_news():
-    print(f"Connecting to Stockwatch API: {API_URL} ...")
-    try:
-        r = requests.get(API_URL, headers=HEADERS_API, timeout=20)
-        r.raise_for_status()
-        response_json = r.json()
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return
-
-    # Validate response structure
-    if not response_json.get("success"):
-        print("API reported failure.")
-        return
-
-    events_data = response_json.get("data", [])
-    if not events_data:
-        print("No events found in 'data'.")
-        return
-
-    print(f"Found {len(events_data)} events. Generating RSS...")
-
-    items_xml = ""
-
+def build_items(events_data):
+    """Yield one RSS item dict per key event."""
     for item in events_data:
         # 1. Extract Basic Fields
         uuid = item.get("uuid")
@@ -136,7 +128,7 @@ def fetch_stockwatch_news():
 
         # Add Official Filing Link (PDF)
         if attachment_url:
-            description_parts.append(f"<p>📄 <a href=\"{attachment_url}\">Read Official Filing (PDF)</a></p>")
+            description_parts.append(f"<p>📄 <a href=\"{clean_xml_text(attachment_url)}\">Read Official Filing (PDF)</a></p>")
 
         # Add Footer Metadata
         meta_info = []
@@ -150,36 +142,49 @@ def fetch_stockwatch_news():
         # 5. Format Date
         pub_rss = format_pubdate(created_at)
 
-        # 6. Append Item to XML
-        items_xml += f"""
-    <item>
-      <title>{clean_xml_text(display_title)}</title>
-      <link>{link}</link>
-      <guid isPermaLink="false">{uuid}</guid>
-      <pubDate>{pub_rss}</pubDate>
-      <category>{clean_xml_text(category)}</category>
-      <description><![CDATA[{full_description}]]></description>
-    </item>"""
-
-    # Final RSS Wrapper
-    rss_feed = f"""<?xml version="1.0" encoding="UTF-8"?>
-<rss xmlns:atom="http://www.w3.org/2005/Atom" version="2.0">
-  <channel>
-    <title>Stockwatch - Key Events</title>
-    <link>https://www.stockwatch.live/</link>
-    <description>Real-time corporate announcements, deals, and financial results.</description>
-    <lastBuildDate>{datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S +0000")}</lastBuildDate>
-    <language>en-in</language>
-    <atom:link href="{API_URL}" rel="self" type="application/rss+xml" />
-    {items_xml}
-  </channel>
-</rss>"""
-
-    # Write to file
+        # 6. Emit Item
+        yield {
+            "title": display_title,
+            "link": link,
+            "guid": uuid,
+            "permalink": False,
+            "pubDate": pub_rss,
+            "category": category,
+            "description": full_description,
+        }
+
+@metrics.run
+def fetch_stockwatch_news():
+    print(f"Connecting to Stockwatch API: {API_URL} ...")
+    try:
+        r = http_cache.get(API_URL, session=session, timeout=20, output=OUTPUT_FILE)
+        r.raise_for_status()
+        if r.not_modified:
+            print("API response unchanged since last run; feed left as is.")
+            return
+        with metrics.stage("parse"):
+            response_json = r.json()
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        return
+
+    # Validate response structure
+    if not response_json.get("success"):
+        print("API reported failure.")
+        return
+
+    events_data = response_json.get("data", [])
+    if not events_data:
+        print("No events found in 'data'.")
+        return
+
+    print(f"Found {len(events_data)} events. Generating RSS...")
+
+    # Merge with the previous feed and stream it to file
     try:
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            f.write(rss_feed)
-        print(f"Successfully saved RSS feed to: {OUTPUT_FILE}")
+        total = feed_writer.write_feed(OUTPUT_FILE, CHANNEL, build_items(events_data), metrics=metrics)
+        http_cache.commit(r.cache_entry)
+        print(f"Successfully saved RSS feed ({total} items) to: {OUTPUT_FILE}")
     except Exception as e:
         print(f"Error writing file: {e}")
 
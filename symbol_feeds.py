@@ -0,0 +1,251 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+from collections import deque
+from html import unescape
+
+import feed_master
+import feed_merge
+import feed_writer
+import item_store
+
+# ================== CONFIG ==================
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WATCHLIST_FILE = os.path.join(BASE_DIR, "watchlist.csv")
+OUT_DIR = "symbols"
+INDEX_FILE = os.path.join(OUT_DIR, "index.json")
+MAX_ITEMS_PER_SYMBOL = 50
+MATCHER_VERSION = 2    # bump when Automaton's matching rules change, so stored matches are redone
+
+# Company suffixes dropped from watchlist names ("Wipro Ltd" -> "Wipro")
+NAME_SUFFIX = re.compile(r"[\s,.]+(ltd|limited|inc|corp)\.?$", re.I)
+TAG = re.compile(r"<[^>]+>")
+SPACES = re.compile(r"\s+")
+
+
+class Automaton:
+    """Aho-Corasick automaton: finds every pattern in a text in one pass.
+
+    Matching is case-insensitive, except that patterns written entirely in
+    capitals (symbols and acronyms such as ITC, SBI, L&T) only match
+    capitals. All matches must sit on word boundaries, and a match lying
+    inside a longer one is dropped, so "SBI Life" does not also count as
+    "SBI".
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+
+    def add(self, pattern, value):
+        state = 0
+        for ch in pattern.lower():
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        exact = pattern if pattern.isupper() else None
+        self.out[state].append((len(pattern), exact, value))
+
+    def build(self):
+        """Compute failure links; call once after the last add()."""
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+        return self
+
+    def find(self, text):
+        """Set of values of the patterns occurring in `text`, leaving out
+        matches that lie inside a longer match."""
+        lower = text.lower()
+        if len(lower) != len(text):
+            lower = "".join(c.lower() if len(c.lower()) == 1 else c for c in text)
+        matches = []
+        state = 0
+        for end, ch in enumerate(lower):
+            while state and ch not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(ch, 0)
+            for length, exact, value in self.out[state]:
+                start = end - length + 1
+                if start > 0 and text[start - 1].isalnum():
+                    continue
+                if end + 1 < len(text) and text[end + 1].isalnum():
+                    continue
+                if exact is not None and text[start:end + 1] != exact:
+                    continue
+                matches.append((start, end + 1, value))
+
+        # Leftmost first and longest first, so a match's containers come
+        # before it; patterns with the very same span all count
+        matches.sort(key=lambda m: (m[0], -m[1]))
+        found = set()
+        reach, reach_span = -1, None
+        for start, end, value in matches:
+            if end <= reach and (start, end) != reach_span:
+                continue
+            found.add(value)
+            if end > reach:
+                reach, reach_span = end, (start, end)
+        return found
+
+
+def load_watchlist(path=WATCHLIST_FILE):
+    """{symbol: company name} and an automaton over symbols, names and aliases.
+
+    Reads this repo's watchlist.csv (symbol,name,aliases with aliases split
+    by "|") or NSE's EQUITY_L.csv (SYMBOL,NAME OF COMPANY) as is.
+    """
+    names = {}
+    automaton = Automaton()
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+            symbol = row.get("symbol")
+            name = row.get("name") or row.get("name of company") or ""
+            if not symbol:
+                continue
+            names[symbol] = name
+            patterns = {symbol, name, NAME_SUFFIX.sub("", name)}
+            patterns.update(a.strip() for a in row.get("aliases", "").split("|"))
+            for pattern in patterns:
+                pattern = SPACES.sub(" ", pattern).strip()
+                if pattern:
+                    automaton.add(pattern, symbol)
+    return names, automaton.build()
+
+
+def item_text(item):
+    """Title and description of an item as plain text."""
+    text = f"{item.get('title') or ''} {item.get('description') or ''}"
+    return SPACES.sub(" ", unescape(TAG.sub(" ", text)))
+
+
+def watchlist_digest(path=WATCHLIST_FILE):
+    """Digest of the watchlist and the matching rules; stored matches are redone when it changes."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read() + f"\nmatcher {MATCHER_VERSION}".encode()).hexdigest()
+
+
+def tag_items(db, automaton, digest):
+    """Match the stored items of the master feed's sources that are not
+    matched yet against the watchlist, or all of them again if the
+    watchlist or the matcher (by `digest`) changed. Returns the number of items checked.
+    """
+    if item_store.get_meta(db, "watchlist") != digest:
+        item_store.reset_symbols(db)
+        item_store.set_meta(db, "watchlist", digest)
+    sources = {path: (label, zone) for path, label, zone in feed_master.SOURCES}
+    pending = item_store.untagged(db, sources)
+    for item_id, source, item in pending:
+        item = feed_master.labelled(item, *sources[source])
+        # Undated items stay out of the symbol feeds, as out of the master feed
+        if item is None:
+            item_store.set_symbols(db, item_id, (), None)
+        else:
+            item_store.set_symbols(db, item_id, automaton.find(item_text(item)),
+                                   feed_merge.item_timestamp(item))
+    db.commit()
+    return len(pending)
+
+
+def symbol_feed_items(db, symbol, max_items=MAX_ITEMS_PER_SYMBOL):
+    """Newest `max_items` stored items mentioning `symbol`, labelled like the
+    master feed's; an item carried by several sources is kept once."""
+    sources = {path: (label, zone) for path, label, zone in feed_master.SOURCES}
+    items, seen = [], set()
+    for source, item in item_store.symbol_items(db, symbol):
+        item = feed_master.labelled(item, *sources[source])
+        key = feed_merge.item_key(item)
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        items.append(item)
+        if len(items) >= max_items:
+            break
+    return items
+
+
+def feed_path(symbol):
+    return os.path.join(OUT_DIR, symbol.replace("/", "_") + ".xml")
+
+
+def main():
+    names, automaton = load_watchlist()
+    db = item_store.connect()
+    try:
+        # Sources no generator has stored yet start from their feed on disk
+        for path, _, _ in feed_master.SOURCES:
+            if os.path.exists(path) and not item_store.has_source(db, path):
+                item_store.import_items(db, path, feed_merge.iter_items(path), os.stat(path).st_mtime)
+        matched = tag_items(db, automaton, watchlist_digest())
+
+        os.makedirs(OUT_DIR, exist_ok=True)
+        summary = {}
+        for symbol in item_store.symbols(db):
+            if symbol not in names:
+                continue
+            channel = {
+                "title": f"{symbol} – {names[symbol]}" if names[symbol] else symbol,
+                "description": f"News mentioning {names[symbol] or symbol} ({symbol}) from all sources",
+                "language": "en-IN",
+            }
+            path = feed_path(symbol)
+            items = symbol_feed_items(db, symbol)
+            feed_writer.write_items(path, feed_writer.published(channel, path), items)
+            summary[symbol] = {"name": names[symbol], "items": len(items), "feed": path}
+    finally:
+        db.close()
+
+    with open(INDEX_FILE + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, sort_keys=True)
+    os.replace(INDEX_FILE + ".tmp", INDEX_FILE)
+    print(f"Symbol feeds: {len(summary)} of {len(names)} watchlist symbols mentioned "
+          f"({matched} new items checked) -> {OUT_DIR}/")
+
+
+def self_check():
+    """Match known headlines against a small watchlist."""
+    automaton = Automaton()
+    for pattern, symbol in [("SBIN", "SBIN"), ("SBI", "SBIN"), ("State Bank of India", "SBIN"),
+                            ("SBILIFE", "SBILIFE"), ("SBI Life", "SBILIFE"),
+                            ("SBI Cards", "SBICARD"), ("ITC", "ITC"), ("Tata Motors", "TATAMOTORS")]:
+        automaton.add(pattern, symbol)
+    automaton.build()
+    cases = [
+        ("SBI Life Insurance Q2 results", {"SBILIFE"}),
+        ("SBI Cards and SBI Life rally", {"SBICARD", "SBILIFE"}),
+        ("SBI raises FD rates; SBI Life flat", {"SBIN", "SBILIFE"}),
+        ("State Bank of India Q2", {"SBIN"}),
+        ("Tata Motors, ITC gain", {"TATAMOTORS", "ITC"}),
+        ("Itc says nothing; Tata Motorsport", set()),
+    ]
+    failed = [(text, automaton.find(text), want) for text, want in cases if automaton.find(text) != want]
+    for text, got, want in failed:
+        print(f"symbol_feeds self-check: {text!r} matched {sorted(got)}, expected {sorted(want)}")
+    if failed:
+        raise SystemExit(1)
+    print("symbol_feeds self-check: ok")
+
+
+if __name__ == "__main__":
+    # --check: run the matcher's self-check instead of building the feeds
+    if "--check" in sys.argv[1:]:
+        self_check()
+    else:
+        main()
@@ -1,7 +1,11 @@
-import requests
 import re
 import os
 from datetime import datetime
+import http_client
+import http_cache
+import feed_writer
+import run_metrics
+from html import escape
 
 # ================= CONFIG =================
 API_URL = "https://trendlyne.com/api/post/list/?pageNumber=1"
@@ -15,6 +19,15 @@ HEADERS = {
     "Referer": "https://trendlyne.com/news-by-trendlyne/",
 }
 
+CHANNEL = {
+    "title": "Trendlyne Latest Market News",
+    "link": "https://trendlyne.com/news-by-trendlyne/",
+    "description": "Latest stock market insights and analyst calls from Trendlyne.",
+}
+
+session = http_client.Session(HEADERS, name="trendlyne")
+metrics = run_metrics.recorder("trendlyne")
+
 def create_slug(text):
     """Creates a URL-friendly slug from the title."""
     text = text.lower()
@@ -31,58 +44,52 @@ def format_date(date_str):
     except:
         return date_str
 
+def build_items(articles):
+    """Yields one RSS item dict per post."""
+    for art in articles:
+        title = art.get('title', 'No Title')
+        post_id = art.get('postId')
+        short_text = art.get('shortText', '')
+        image_url = art.get('imageUrl', '')
+        pub_date = format_date(art.get('pubDate', ''))
+
+        # Generate the Trendlyne URL structure: /posts/ID/slug
+        slug = create_slug(title)
+        link = f"{BASE_URL}/posts/{post_id}/{slug}/"
+
+        description = (
+            f'<img src="{escape(image_url or "")}" style="width:100%;" /><br/>'
+            f'<p>{escape(short_text or "")}</p>'
+            f"<p><strong>Premium:</strong> {'Yes' if art.get('isPremiumPost') else 'No'}</p>"
+        )
+
+        yield {
+            "title": title,
+            "link": link,
+            "guid": link,
+            "permalink": True,
+            "pubDate": pub_date,
+            "description": description,
+        }
+
+@metrics.run
 def fetch_and_build_rss():
     print(f"Fetching data from {API_URL}...")
     
     try:
-        response = requests.get(API_URL, headers=HEADERS)
+        response = http_cache.get(API_URL, session=session, output=OUTPUT_FILE)
         response.raise_for_status()
-        data = response.json()
+        if response.not_modified:
+            print("API response unchanged since last run; feed left as is.")
+            return
+        with metrics.stage("parse"):
+            data = response.json()
         
         articles = data.get('body', {}).get('main', [])
         
-        items_xml = ""
-        
-        for art in articles:
-            title = art.get('title', 'No Title')
-            post_id = art.get('postId')
-            short_text = art.get('shortText', '')
-            image_url = art.get('imageUrl', '')
-            pub_date = format_date(art.get('pubDate', ''))
-            
-            # Generate the Trendlyne URL structure: /posts/ID/slug
-            slug = create_slug(title)
-            link = f"{BASE_URL}/posts/{post_id}/{slug}/"
-            
-            # Build Item XML
-            items_xml += f"""
-    <item>
-      <title><![CDATA[{title}]]></title>
-      <link>{link}</link>
-      <guid isPermaLink="true">{link}</guid>
-      <pubDate>{pub_date}</pubDate>
-      <description><![CDATA[
-        <img src="{image_url}" style="width:100%;" /><br/>
-        <p>{short_text}</p>
-        <p><strong>Premium:</strong> {'Yes' if art.get('isPremiumPost') else 'No'}</p>
-      ]]></description>
-    </item>"""
-
-        # Final RSS Assembly
-        rss_full = f"""<?xml version="1.0" encoding="UTF-8"?>
-<rss version="2.0">
-  <channel>
-    <title><![CDATA[Trendlyne Latest Market News]]></title>
-    <link>https://trendlyne.com/news-by-trendlyne/</link>
-    <description><![CDATA[Latest stock market insights and analyst calls from Trendlyne.]]></description>
-    <lastBuildDate>{datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0000")}</lastBuildDate>
-    {items_xml}
-  </channel>
-</rss>"""
-
-        # Write to file
-        with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-            f.write(rss_full)
+        # Merge with the previous feed and stream it to file
+        feed_writer.write_feed(OUTPUT_FILE, CHANNEL, build_items(articles), metrics=metrics)
+        http_cache.commit(response.cache_entry)
             
         print(f"Successfully wrote RSS to {os.path.abspath(OUTPUT_FILE)}")
 
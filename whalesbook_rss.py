@@ -1,12 +1,23 @@
-import requests
-import xml.etree.ElementTree as ET
+import http_client
 from datetime import datetime
 import re
 import json
+import feed_writer
+import run_metrics
 
 # --- CONFIGURATION ---
 API_URL = "https://app1.whalesbook1.shop/published-news-collection/v2/free"
 SITE_ROOT = "https://www.whalesbook.com"
+OUTPUT_FILE = "whalesbook-news.xml"
+
+CHANNEL = {
+    "title": "Whalesbook Financial News",
+    "link": f"{SITE_ROOT}/news/English/All",
+    "description": "Latest Indian and global financial market news",
+}
+
+session = http_client.Session(name="whalesbook")
+metrics = run_metrics.recorder("whalesbook")
 
 def create_slug(text):
     if not text: return ""
@@ -53,7 +64,7 @@ def fetch_news():
 
     try:
         # SWITCHED BACK TO POST
-        resp = requests.post(API_URL, json=payload, headers=headers, timeout=30)
+        resp = session.post(API_URL, json=payload, headers=headers, timeout=30)
         
         # DEBUGGING: Check if request failed
         if resp.status_code != 200:
@@ -61,7 +72,8 @@ def fetch_news():
             print(f"⚠️ Response Text: {resp.text[:500]}") # Print first 500 chars to see error
             return []
 
-        return resp.json().get("data", [])
+        with metrics.stage("parse"):
+            return resp.json().get("data", [])
 
     except json.JSONDecodeError:
         print("❌ Error: Server did not return JSON.")
@@ -80,43 +92,31 @@ def format_pubdate(iso_ts):
     except:
         return datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S +0000")
 
-def generate_rss_xml(items):
-    rss = ET.Element("rss", version="2.0")
-    channel = ET.SubElement(rss, "channel")
-    ET.SubElement(channel, "title").text = "Whalesbook Financial News"
-    ET.SubElement(channel, "link").text = f"{SITE_ROOT}/news/English/All"
-    ET.SubElement(channel, "description").text = "Latest Indian and global financial market news"
-    ET.SubElement(channel, "pubDate").text = datetime.utcnow().strftime("%a, %d %b %Y %H:%M:%S +0000")
-
-    count = 0
+def build_items(items):
+    """Yield one RSS item dict per article that has a usable link."""
     for item in items:
         link = build_article_link(item)
         if not link: continue
 
-        entry = ET.SubElement(channel, "item")
-        ET.SubElement(entry, "title").text = item.get("headline", "Untitled").strip()
-        ET.SubElement(entry, "link").text = link
-        ET.SubElement(entry, "guid").text = link
-        ET.SubElement(entry, "description").text = (item.get("shortDescription") or "").strip()
-        
-        pub = format_pubdate(item.get("scrappedAt", ""))
-        if pub: ET.SubElement(entry, "pubDate").text = pub
+        entry = {
+            "title": (item.get("headline") or "Untitled").strip(),
+            "link": link,
+            "guid": link,
+            "description": (item.get("shortDescription") or "").strip(),
+            "pubDate": format_pubdate(item.get("scrappedAt", "")),
+        }
 
         image_url = item.get("imageUrl")
         if image_url:
-            ET.SubElement(entry, "enclosure", attrib={"url": image_url, "type": "image/jpeg"})
-        count += 1
-    
-    print(f"Generated RSS with {count} items.")
-    return ET.tostring(rss, encoding="utf-8", xml_declaration=True).decode("utf-8")
+            entry["enclosure"] = {"url": image_url, "type": "image/jpeg"}
+        yield entry
 
+@metrics.run
 def main():
     items = fetch_news()
     if items:
-        rss_xml = generate_rss_xml(items)
-        with open("whalesbook-news.xml", "w", encoding="utf-8") as f:
-            f.write(rss_xml)
-        print("✅ whalesbook-news.xml generated successfully")
+        total = feed_writer.write_feed(OUTPUT_FILE, CHANNEL, build_items(items), metrics=metrics)
+        print(f"✅ {OUTPUT_FILE} generated successfully ({total} items)")
     else:
         print("❌ No items fetched. XML not generated.")
 